@@ -1,6 +1,7 @@
 """The BUTT Integration."""
 
 import logging
+import time
 
 import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
@@ -13,13 +14,33 @@ from homeassistant.const import (
     Platform,
 )
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
 
+from .capture import StatusCapture
 from .const import (
+    CONF_CAPTURE,
+    CONF_SKIP_SENSOR_STATISTICS,
+    CONF_STATISTICS,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_EVENT_DEBOUNCE,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_VU_SAMPLE_INTERVAL,
+    CONF_VU_WINDOW,
+    DATA_FLEET,
+    DEFAULT_EVENT_DEBOUNCE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
     DEFAULT_NAME,
     DEFAULT_SCAN_INTERVAL,
+    DEFAULT_VU_SAMPLE_INTERVAL,
+    DEFAULT_VU_WINDOW,
     DOMAIN,
+    STORAGE_VERSION,
 )
+from .fleet import ButtFleet
 from .hub import ButtHub
+from .longterm import HourlyStatistics
+from .services import async_cancel_scheduled, async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -50,11 +71,62 @@ PLATFORMS: list[Platform] = [
 
 async def async_setup(hass, config):
     hass.data[DOMAIN] = {}
+    hass.data[DATA_FLEET] = ButtFleet(hass)
+    async_setup_services(hass)
     return True
 
 
-async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    await hass.config_entries.async_reload(entry.entry_id)
+def _reload_options(options) -> dict:
+    """Return the options that only take effect on a reload."""
+    return {
+        CONF_VU_SAMPLE_INTERVAL: options.get(
+            CONF_VU_SAMPLE_INTERVAL, DEFAULT_VU_SAMPLE_INTERVAL
+        ),
+        CONF_VU_WINDOW: options.get(CONF_VU_WINDOW, DEFAULT_VU_WINDOW),
+        CONF_CAPTURE: options.get(CONF_CAPTURE, False),
+        CONF_STATISTICS: options.get(CONF_STATISTICS, False),
+        CONF_SKIP_SENSOR_STATISTICS: options.get(CONF_SKIP_SENSOR_STATISTICS, False),
+        **{
+            CONF_EVENT_DEBOUNCE.format(key): options.get(
+                CONF_EVENT_DEBOUNCE.format(key), default
+            )
+            for key, default in DEFAULT_EVENT_DEBOUNCE.items()
+        },
+    }
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running hub, reload for the others."""
+    registered = hass.data[DOMAIN][entry.data[CONF_NAME]]
+    if _reload_options(registered["options"]) != _reload_options(entry.options):
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    start = time.perf_counter()
+    hub: ButtHub = registered["hub"]
+    fleet: ButtFleet = hass.data[DATA_FLEET]
+    host = entry.options.get(CONF_HOST, entry.data[CONF_HOST])
+    port = entry.options.get(CONF_PORT, entry.data[CONF_PORT])
+
+    # Cancels a poll in flight, the hub restarts at the phase of its server
+    fleet.async_unregister(hub)
+    if (host, port) != (hub.host, hub.port):
+        old_host, old_port = hub.host, hub.port
+        hub.async_set_connection(host, port, fleet.async_get_connection(host, port))
+        await fleet.async_release_connection(old_host, old_port)
+    hub.async_set_scan_interval(
+        entry.options.get(CONF_SCAN_INTERVAL, entry.data[CONF_SCAN_INTERVAL]),
+        entry.options.get(CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL),
+        entry.options.get(CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL),
+    )
+    fleet.async_register(hub)
+    registered["options"] = dict(entry.options)
+
+    _LOGGER.debug(
+        "Applied options to %s in %.1f ms",
+        hub.name,
+        (time.perf_counter() - start) * 1000,
+    )
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -62,23 +134,77 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     name = entry.data[CONF_NAME]
     port = entry.options.get(CONF_PORT, entry.data[CONF_PORT])
     scan_interval = entry.options.get(CONF_SCAN_INTERVAL, entry.data[CONF_SCAN_INTERVAL])
+    min_scan_interval = entry.options.get(
+        CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+    )
+    max_scan_interval = entry.options.get(
+        CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+    )
+    vu_sample_interval = entry.options.get(
+        CONF_VU_SAMPLE_INTERVAL, DEFAULT_VU_SAMPLE_INTERVAL
+    )
+    vu_window = entry.options.get(CONF_VU_WINDOW, DEFAULT_VU_WINDOW)
+    event_debounce = {
+        key: entry.options.get(CONF_EVENT_DEBOUNCE.format(key), default)
+        for key, default in DEFAULT_EVENT_DEBOUNCE.items()
+    }
 
     _LOGGER.debug("Setup %s.%s", DOMAIN, name)
 
-    hub = ButtHub(hass, name, host, port, scan_interval)
-    await hub.async_config_entry_first_refresh()
+    fleet: ButtFleet = hass.data[DATA_FLEET]
+    hub = ButtHub(
+        hass,
+        name,
+        host,
+        port,
+        scan_interval,
+        min_scan_interval,
+        max_scan_interval,
+        connection=fleet.async_get_connection(host, port),
+        vu_sample_interval=vu_sample_interval,
+        vu_window=vu_window,
+        store=Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}"),
+        event_debounce=event_debounce,
+        capture=(
+            StatusCapture(hass, hass.config.path(f"{DOMAIN}_{entry.entry_id}.cap"))
+            if entry.options.get(CONF_CAPTURE, False)
+            else None
+        ),
+        statistics=(
+            HourlyStatistics(hass, name)
+            if entry.options.get(CONF_STATISTICS, False)
+            else None
+        ),
+    )
+    # Entities start from the last known status, the fleet polls right
+    # away in the background so unreachable servers don't delay the setup
+    await hub.async_restore_status()
+    fleet.async_register(hub)
+    hub.async_start_vu_sampler()
 
     """Register the hub."""
-    hass.data[DOMAIN][name] = {"hub": hub}
+    hass.data[DOMAIN][name] = {"hub": hub, "options": dict(entry.options)}
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     if unloaded := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.data["name"])
+        hub: ButtHub = hass.data[DOMAIN].pop(entry.data[CONF_NAME])["hub"]
+        async_cancel_scheduled(hass, hub.name)
+        fleet: ButtFleet = hass.data[DATA_FLEET]
+        fleet.async_unregister(hub)
+        hub.async_stop_vu_sampler()
+        if hub.capture is not None:
+            await hub.capture.async_flush()
+        # Closes the socket unless another hub still uses it
+        await fleet.async_release_connection(hub.host, hub.port)
     return unloaded
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
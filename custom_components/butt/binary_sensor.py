@@ -3,8 +3,6 @@ from __future__ import annotations
 import logging
 
 from dataclasses import dataclass
-from datetime import datetime
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.binary_sensor import (
     BinarySensorEntity,
     BinarySensorEntityDescription,
@@ -12,80 +10,33 @@ from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
 )
 
-from typing import Optional
-
 from homeassistant.const import CONF_NAME
-from homeassistant.core import callback
-import homeassistant.util.dt as dt_util
-
-from .const import (
-    ATTR_MANUFACTURER,
-    DOMAIN,
-)
 
-from .hub import ButtHub
+from .const import DOMAIN
+from .entity import ButtEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    hub_name = entry.data[CONF_NAME]
-    hub = hass.data[DOMAIN][hub_name]["hub"]
-
-    device_info = {
-        "identifiers": {(DOMAIN, hub_name)},
-        "name": hub_name,
-        "manufacturer": ATTR_MANUFACTURER,
-    }
-
-    entities = []
-    for binary_sensor_description in BINARY_SENSOR_TYPES.values():
-        binary_sensor = ButtBinarySensor(
-            hub_name,
-            hub,
-            device_info,
-            binary_sensor_description,
-        )
-        entities.append(binary_sensor)
-
-    async_add_entities(entities)
+    hub = hass.data[DOMAIN][entry.data[CONF_NAME]]["hub"]
+
+    async_add_entities(
+        ButtBinarySensor(hub, binary_sensor_description)
+        for binary_sensor_description in BINARY_SENSOR_TYPES.values()
+    )
     return True
 
 
-class ButtBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class ButtBinarySensor(ButtEntity, BinarySensorEntity):
     """Representation of an Butt sensor."""
 
-    def __init__(
-        self,
-        platform_name: str,
-        hub: ButtHub,
-        device_info,
-        description: ButtBinarySensorEntityDescription,
-    ):
-        """Initialize the sensor."""
-        self._platform_name = platform_name
-        self._attr_device_info = device_info
-        self.entity_description: ButtBinarySensorEntityDescription = description
-
-        super().__init__(coordinator=hub)
-
-    @property
-    def name(self):
-        """Return the name."""
-        return f"{self._platform_name} {self.entity_description.name}"
-
-    @property
-    def unique_id(self) -> Optional[str]:
-        return f"{self._platform_name}_{self.entity_description.key}"
+    entity_description: ButtBinarySensorEntityDescription
 
     @property
     def is_on(self):
         """Return the state of the sensor."""
-        return (
-            self.coordinator.data[self.entity_description.key]
-            if self.entity_description.key in self.coordinator.data
-            else None
-        )
+        return self._value
 
 
 @dataclass
@@ -0,0 +1,76 @@
+"""Butt circuit breaker"""
+
+from __future__ import annotations
+
+import time
+from enum import StrEnum
+
+COOLOFF_MIN = 5
+COOLOFF_MAX = 300
+
+
+class BreakerState(StrEnum):
+    """State of a circuit breaker."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised when a request is skipped because the breaker is open."""
+
+
+class CircuitBreaker:
+    """Skip requests to an unreachable server for a growing cool-off.
+
+    The breaker opens on a failed request. While open, requests are
+    rejected without touching the network. After the cool-off one probe
+    request is let through (half open): success closes the breaker, failure
+    opens it again with twice the cool-off.
+    """
+
+    __slots__ = ("state", "cooloff", "_open_until", "_cooloff_min", "_cooloff_max")
+
+    def __init__(self, cooloff_min: float = COOLOFF_MIN, cooloff_max: float = COOLOFF_MAX):
+        self.state = BreakerState.CLOSED
+        self.cooloff = 0.0
+        self._open_until = 0.0
+        self._cooloff_min = cooloff_min
+        self._cooloff_max = cooloff_max
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        if self.state is BreakerState.CLOSED:
+            return True
+        if self.state is BreakerState.OPEN and time.monotonic() >= self._open_until:
+            self.state = BreakerState.HALF_OPEN
+            return True
+        # Open, or half open with the probe still in flight
+        return False
+
+    @property
+    def retry_in(self) -> float:
+        """Return the seconds until the next probe is allowed."""
+        return max(self._open_until - time.monotonic(), 0.0)
+
+    def success(self) -> bool:
+        """Record a successful request, return True if the breaker closed."""
+        if self.state is BreakerState.CLOSED:
+            return False
+        self.state = BreakerState.CLOSED
+        self.cooloff = 0.0
+        return True
+
+    def cancel_probe(self) -> None:
+        """Allow a new probe after the probe request was cancelled."""
+        if self.state is BreakerState.HALF_OPEN:
+            self.state = BreakerState.OPEN
+
+    def failure(self) -> bool:
+        """Record a failed request, return True if the breaker opened."""
+        opened = self.state is BreakerState.CLOSED
+        self.cooloff = min(max(self.cooloff * 2, self._cooloff_min), self._cooloff_max)
+        self._open_until = time.monotonic() + self.cooloff
+        self.state = BreakerState.OPEN
+        return opened
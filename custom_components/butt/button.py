@@ -1,7 +1,5 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from datetime import datetime
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.components.button import (
     ButtonEntity,
     ButtonEntityDescription,
@@ -10,16 +8,13 @@ from homeassistant.components.button import (
 import logging
 from typing import Callable, Optional
 
+from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_NAME
-from homeassistant.core import callback
-import homeassistant.util.dt as dt_util
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import (
-    ATTR_MANUFACTURER,
-    DOMAIN,
-)
-
-from .hub import ButtHub
+from .const import DOMAIN
+from .entity import ButtEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -29,54 +24,18 @@ async def async_setup_entry(
     config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
-    hub_name = config_entry.data[CONF_NAME]
-    hub = hass.data[DOMAIN][hub_name]["hub"]
-
-    device_info = {
-        "identifiers": {(DOMAIN, hub_name)},
-        "name": hub_name,
-        "manufacturer": ATTR_MANUFACTURER,
-    }
-
-    entities = []
-    for button_description in BUTTON_TYPES.values():
-        button = ButtButton(
-            hub_name,
-            hub,
-            device_info,
-            button_description,
-        )
-        entities.append(button)
+    hub = hass.data[DOMAIN][config_entry.data[CONF_NAME]]["hub"]
 
-    async_add_entities(entities)
+    async_add_entities(
+        ButtButton(hub, button_description)
+        for button_description in BUTTON_TYPES.values()
+    )
 
 
-class ButtButton(CoordinatorEntity, ButtonEntity):
+class ButtButton(ButtEntity, ButtonEntity):
     """Representation of an Ampere Storage Pro Modbus sensor."""
 
-    def __init__(
-        self,
-        platform_name: str,
-        hub: ButtHub,
-        device_info,
-        description: ButtButtonEntityDescription,
-    ):
-        """Initialize the sensor."""
-        self._platform_name = platform_name
-        self._attr_device_info = device_info
-        self.entity_description: ButtButtonEntityDescription = description
-        self.hub = hub
-
-        super().__init__(coordinator=hub)
-
-    @property
-    def name(self):
-        """Return the name."""
-        return f"{self._platform_name} {self.entity_description.name}"
-
-    @property
-    def unique_id(self) -> Optional[str]:
-        return f"{self._platform_name}_{self.entity_description.key}"
+    entity_description: ButtButtonEntityDescription
 
     async def async_press(self) -> None:
         """Handle the button press."""
@@ -86,7 +45,7 @@ class ButtButton(CoordinatorEntity, ButtonEntity):
         # elif self.entity_description.key == "stoprecord":
         #    await self.hub.stop_record()  # Ruft die Stop-Funktion auf
         if self.entity_description.buttonFunction:
-            await self.entity_description.buttonFunction(self.hub)
+            await self.entity_description.buttonFunction(self.coordinator)
         else:
             _LOGGER.error("No function defined for this button")
 
@@ -0,0 +1,78 @@
+"""Butt raw status capture"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import CAPTURE_FLUSH_DELAY, DEFAULT_CAPTURE_SIZE
+from .replay import MAGIC, RECORD
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class StatusCapture:
+    """Append raw status replies to a size capped, rotating binary log.
+
+    Replies are buffered in memory and written in batches in the executor.
+    The log is read back with the replay module.
+    When a batch would grow the log beyond max_size it is renamed to
+    <path>.1, replacing the previous one, and a new log is started.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str, max_size: int = DEFAULT_CAPTURE_SIZE):
+        self.hass = hass
+        self.path = path
+        self.max_size = max_size
+        self._buffer: list[bytes] = []
+        self._flush_handle = None
+
+    @callback
+    def async_add(self, payload: bytes) -> None:
+        """Capture a raw reply."""
+        self._buffer.append(RECORD.pack(time.monotonic(), len(payload)))
+        self._buffer.append(payload)
+        if self._flush_handle is None:
+            self._flush_handle = self.hass.loop.call_later(
+                CAPTURE_FLUSH_DELAY, self._async_schedule_flush
+            )
+
+    @callback
+    def _async_schedule_flush(self) -> None:
+        self._flush_handle = None
+        self.hass.async_create_background_task(
+            self.async_flush(), f"butt capture flush {self.path}"
+        )
+
+    async def async_flush(self) -> None:
+        """Write the buffered replies."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+
+        data = b"".join(self._buffer)
+        self._buffer.clear()
+        try:
+            await self.hass.async_add_executor_job(self._write, data)
+        except OSError as err:
+            _LOGGER.error("Writing the capture %s failed: %s", self.path, err)
+
+    def _write(self, data: bytes) -> None:
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            size = 0
+
+        if size and size + len(data) > self.max_size:
+            os.replace(self.path, f"{self.path}.1")
+            size = 0
+
+        with open(self.path, "ab") as file:
+            if not size:
+                file.write(MAGIC)
+            file.write(data)
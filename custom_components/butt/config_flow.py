@@ -4,21 +4,41 @@ import re
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.components.network import async_get_source_ip
 from homeassistant.core import HomeAssistant, callback
 
 from .const import (
+    CONF_CAPTURE,
+    CONF_SKIP_SENSOR_STATISTICS,
+    CONF_EVENT_DEBOUNCE,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_NETWORK,
+    CONF_STATISTICS,
+    CONF_VU_SAMPLE_INTERVAL,
+    CONF_VU_WINDOW,
+    DEFAULT_EVENT_DEBOUNCE,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_VU_SAMPLE_INTERVAL,
+    DEFAULT_VU_WINDOW,
     DEFAULT_NAME,
     DEFAULT_PORT,
     DEFAULT_SCAN_INTERVAL,
     DOMAIN,
 )
+from .decoder import ButtStatus
+from .discovery import async_discover, discovery_hosts
+
+# Poll intervals in whole seconds, 0 would poll in a busy loop
+INTERVAL = vol.All(vol.Coerce(int), vol.Range(min=1))
 
 DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_NAME, default=DEFAULT_NAME): str,
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
-        vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
+        vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): INTERVAL,
     }
 )
 
@@ -43,8 +63,16 @@ class ButtConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def async_get_options_flow(config_entry):
         return ButtOptionsFlowHandler()
 
+    def __init__(self):
+        self._discovered: dict[str, ButtStatus] = {}
+        self._port = DEFAULT_PORT
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["scan", "manual"])
+
+    async def async_step_manual(self, user_input=None):
+        """Handle a server entered by hand."""
         errors = {}
 
         if user_input is not None:
@@ -58,7 +86,77 @@ class ButtConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 )
 
         return self.async_show_form(
-            step_id="user", data_schema=DATA_SCHEMA, errors=errors
+            step_id="manual", data_schema=DATA_SCHEMA, errors=errors
+        )
+
+    async def async_step_scan(self, user_input=None):
+        """Search a subnet or a list of hosts for BUTT servers."""
+        errors = {}
+
+        if user_input is not None:
+            try:
+                hosts = discovery_hosts(user_input[CONF_NETWORK])
+            except ValueError:
+                errors[CONF_NETWORK] = "invalid_network"
+            else:
+                configured = {
+                    entry.options.get(CONF_HOST, entry.data[CONF_HOST])
+                    for entry in self._async_current_entries()
+                }
+                self._port = user_input[CONF_PORT]
+                self._discovered = {
+                    host: status
+                    for host, status in (
+                        await async_discover(hosts, self._port)
+                    ).items()
+                    if host not in configured
+                }
+                if self._discovered:
+                    return await self.async_step_pick()
+                errors["base"] = "no_servers"
+
+        network = ""
+        if source_ip := await async_get_source_ip(self.hass):
+            network = str(ipaddress.ip_network(f"{source_ip}/24", strict=False))
+
+        return self.async_show_form(
+            step_id="scan",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_NETWORK, default=network): str,
+                    vol.Required(CONF_PORT, default=self._port): int,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_pick(self, user_input=None):
+        """Set up one of the discovered servers."""
+        if user_input is not None:
+            await self.async_set_unique_id(user_input[CONF_NAME])
+            self._abort_if_unique_id_configured()
+            return self.async_create_entry(
+                title=user_input[CONF_NAME],
+                data={
+                    CONF_NAME: user_input[CONF_NAME],
+                    CONF_HOST: user_input[CONF_HOST],
+                    CONF_PORT: self._port,
+                    CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL,
+                },
+            )
+
+        servers = {
+            host: f"{host} ({'connected' if status.connected else 'idle'})"
+            for host, status in self._discovered.items()
+        }
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST): vol.In(servers),
+                    vol.Required(CONF_NAME, default=DEFAULT_NAME): str,
+                }
+            ),
         )
 
 
@@ -69,6 +167,12 @@ class ButtOptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             if not host_valid(user_input[CONF_HOST]):
                 errors[CONF_HOST] = "invalid host IP"
+            elif not (
+                user_input[CONF_MIN_SCAN_INTERVAL]
+                <= user_input[CONF_SCAN_INTERVAL]
+                <= user_input[CONF_MAX_SCAN_INTERVAL]
+            ):
+                errors["base"] = "invalid_intervals"
             else:
                 return self.async_create_entry(title="", data=user_input)
 
@@ -94,7 +198,54 @@ class ButtOptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_SCAN_INTERVAL,
                             self.config_entry.data[CONF_SCAN_INTERVAL],
                         ),
-                    ): int,
+                    ): INTERVAL,
+                    vol.Optional(
+                        CONF_MIN_SCAN_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_SCAN_INTERVAL
+                        ),
+                    ): INTERVAL,
+                    vol.Optional(
+                        CONF_MAX_SCAN_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_SCAN_INTERVAL
+                        ),
+                    ): INTERVAL,
+                    vol.Optional(
+                        CONF_VU_SAMPLE_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_VU_SAMPLE_INTERVAL, DEFAULT_VU_SAMPLE_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    vol.Optional(
+                        CONF_VU_WINDOW,
+                        default=self.config_entry.options.get(
+                            CONF_VU_WINDOW, DEFAULT_VU_WINDOW
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=1)),
+                    **{
+                        vol.Optional(
+                            CONF_EVENT_DEBOUNCE.format(key),
+                            default=self.config_entry.options.get(
+                                CONF_EVENT_DEBOUNCE.format(key), default
+                            ),
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0))
+                        for key, default in DEFAULT_EVENT_DEBOUNCE.items()
+                    },
+                    vol.Optional(
+                        CONF_CAPTURE,
+                        default=self.config_entry.options.get(CONF_CAPTURE, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_STATISTICS,
+                        default=self.config_entry.options.get(CONF_STATISTICS, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_SKIP_SENSOR_STATISTICS,
+                        default=self.config_entry.options.get(
+                            CONF_SKIP_SENSOR_STATISTICS, False
+                        ),
+                    ): bool,
                 }
             ),
             errors=errors,
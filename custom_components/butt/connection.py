@@ -0,0 +1,342 @@
+"""Butt Connection"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from .breaker import CircuitBreaker, CircuitOpenError
+from .const import CMD_GET_STATUS, DEFAULT_MAX_REPLY_SIZE
+from .decoder import EXTENDED_SIZE, HEADER_SIZE, STATUS_SIZE, is_extended, payload_size
+from .stats import ButtStats
+
+_LOGGER = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 3
+
+_T = TypeVar("_T")
+
+
+class ButtConnection:
+    """Reusable TCP connection to a BUTT server.
+
+    The connection is opened lazily and kept open between requests as long as
+    the server allows it. Servers that close the socket after each reply are
+    detected and handled by reconnecting for every request. A circuit
+    breaker rejects requests to an unreachable server without touching the
+    network.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        timeout: float = CONNECT_TIMEOUT,
+        max_reply_size: int = DEFAULT_MAX_REPLY_SIZE,
+    ):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.max_reply_size = max_reply_size
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock = asyncio.Lock()
+        self._status_request: asyncio.Task | None = None
+
+        self._keep_alive = True
+        # No request was answered on the open socket yet
+        self._fresh = False
+        # Command and status opcode in one write, off for servers that
+        # take one command per connection
+        self._pipelining = True
+
+        self.breaker = CircuitBreaker()
+        self.stats = ButtStats()
+
+    @property
+    def connected(self) -> bool:
+        """Return True if an open connection can be reused."""
+        return (
+            self._writer is not None
+            and not self._writer.is_closing()
+            and not self._reader.at_eof()
+        )
+
+    async def async_request(self, command: bytes) -> bytes:
+        """Send a command and return the reply.
+
+        Only the status command is answered by the server, all other
+        commands return an empty reply. Concurrent status requests share
+        a single round-trip.
+        """
+        if command != CMD_GET_STATUS:
+            return await self._async_locked_request(command)
+
+        if self._status_request is None:
+            self._status_request = asyncio.ensure_future(
+                self._async_locked_request(command)
+            )
+            self._status_request.add_done_callback(self._status_request_done)
+        return await asyncio.shield(self._status_request)
+
+    async def async_request_with_status(
+        self, command: bytes
+    ) -> tuple[float, bytes | None]:
+        """Send a command and read the status after it.
+
+        The status opcode is written together with the command, so the
+        reply arrives in the same round-trip. The command is sent at most
+        once: if no status follows it, the status is requested separately,
+        and a server that closes after the command is not sent both
+        opcodes at once again.
+
+        Returns the seconds until the command was written and the status
+        reply, None if no status could be read. Raises if the command
+        could not be sent.
+        """
+        start = time.perf_counter()
+        reply = None
+        async with self._lock:
+            pipelined = self._pipelining
+            reused = self.connected
+            await self._async_guarded(
+                self._async_send_reconnecting,
+                command + CMD_GET_STATUS if pipelined else command,
+            )
+            sent = time.perf_counter() - start
+
+            if pipelined:
+                try:
+                    reply = await self._async_read_reply(start)
+                except (
+                    ConnectionError,
+                    asyncio.IncompleteReadError,
+                    asyncio.TimeoutError,
+                    ValueError,
+                ) as err:
+                    # The command was delivered, only its status is missing.
+                    # That says nothing about the reachability of the server.
+                    await self._async_close()
+                    if not reused and isinstance(err, asyncio.IncompleteReadError):
+                        _LOGGER.debug(
+                            "BUTT Server (%s:%s) takes one command per connection",
+                            self.host,
+                            self.port,
+                        )
+                        self._pipelining = False
+            self.stats.requests += 1
+            await self._async_close_if_done()
+
+        if reply is None:
+            try:
+                reply = await self.async_request(CMD_GET_STATUS)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                reply = None
+        return sent, reply
+
+    def _status_request_done(self, task: asyncio.Task) -> None:
+        self._status_request = None
+        if not task.cancelled():
+            # Mark the exception as retrieved if every caller was cancelled
+            task.exception()
+
+    async def _async_locked_request(self, command: bytes) -> bytes:
+        async with self._lock:
+            return await self._async_guarded(self._async_request_reconnecting, command)
+
+    async def _async_guarded(
+        self, request: Callable[[bytes], Awaitable[_T]], command: bytes
+    ) -> _T:
+        """Run a request through the circuit breaker, the lock must be held."""
+        breaker = self.breaker
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"BUTT Server ({self.host}:{self.port}) is unreachable, "
+                f"next attempt in {breaker.retry_in:.0f}s"
+            )
+
+        try:
+            result = await request(command)
+        except asyncio.CancelledError:
+            breaker.cancel_probe()
+            raise
+        except ValueError:
+            # The server answered, just not with a valid packet
+            breaker.success()
+            raise
+        except Exception:
+            if breaker.failure():
+                _LOGGER.debug("Circuit breaker for %s:%s opened", self.host, self.port)
+            raise
+
+        if breaker.success():
+            _LOGGER.debug("Circuit breaker for %s:%s closed", self.host, self.port)
+        return result
+
+    async def _async_request_reconnecting(self, command: bytes) -> bytes:
+        reused = self.connected
+        try:
+            return await self._async_request(command)
+        except (asyncio.TimeoutError, ValueError):
+            await self._async_close()
+            raise
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self._async_close()
+            if not reused:
+                raise
+        # The idle socket was dropped (server restart, NAT timeout), retry
+        # once on a fresh one. Only a fresh connection closed after its
+        # reply shows the server closes after each request.
+        try:
+            return await self._async_request(command)
+        except (
+            ConnectionError,
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ValueError,
+        ):
+            await self._async_close()
+            raise
+
+    async def _async_send_reconnecting(self, data: bytes) -> None:
+        """Write without reading, retry once if an idle socket was dropped."""
+        reused = self.connected
+        try:
+            await self._async_write(data, time.perf_counter())
+            return
+        except (ConnectionError, asyncio.TimeoutError):
+            await self._async_close()
+            if not reused:
+                raise
+        # The write failed, so the server did not get the command
+        try:
+            await self._async_write(data, time.perf_counter())
+        except (ConnectionError, asyncio.TimeoutError):
+            await self._async_close()
+            raise
+
+    async def _async_request(self, command: bytes) -> bytes:
+        start = time.perf_counter()
+        await self._async_write(command, start)
+
+        data = b""
+        if command == CMD_GET_STATUS:
+            data = await self._async_read_reply(start)
+        self.stats.requests += 1
+
+        await self._async_close_if_done()
+        return data
+
+    async def _async_write(self, data: bytes, start: float) -> None:
+        stats = self.stats
+        if not self.connected:
+            await self._async_connect()
+            stats.connect.add(time.perf_counter() - start)
+
+        write_start = time.perf_counter()
+        self._writer.write(data)
+        await self._writer.drain()
+        stats.write.add(time.perf_counter() - write_start)
+
+    async def _async_read_reply(self, start: float) -> bytes:
+        """Read a status reply of a request started at start."""
+        stats = self.stats
+        read_start = time.perf_counter()
+        data = await asyncio.wait_for(self._async_read_status(), self.timeout)
+        end = time.perf_counter()
+        stats.read.add(end - read_start)
+        stats.request.add(end - start)
+        stats.bytes_read += len(data)
+        return data
+
+    async def _async_close_if_done(self) -> None:
+        """Close the socket if the server closes it after each request."""
+        if self._writer is None:
+            return
+        fresh = self._fresh
+        self._fresh = False
+        if not self._keep_alive or self._reader.at_eof():
+            # A reused socket may have been dropped for other reasons
+            if self._keep_alive and fresh:
+                _LOGGER.debug(
+                    "BUTT Server (%s:%s) closes after each reply",
+                    self.host,
+                    self.port,
+                )
+                self._keep_alive = False
+            await self._async_close()
+
+    async def _async_read_status(self) -> bytes:
+        """Read exactly one status packet as announced by its length fields."""
+        reader = self._reader
+
+        start = time.perf_counter()
+        status = await reader.readexactly(STATUS_SIZE)
+        self.stats.first_byte.add(time.perf_counter() - start)
+        if not is_extended(status):
+            return status
+
+        extended = await reader.readexactly(EXTENDED_SIZE)
+        size = payload_size(extended)
+        if HEADER_SIZE + size > self.max_reply_size:
+            raise ValueError(
+                f"Status packet of {HEADER_SIZE + size} bytes exceeds the "
+                f"maximum of {self.max_reply_size} bytes"
+            )
+
+        return b"".join((status, extended, await reader.readexactly(size)))
+
+    async def _async_connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        self._fresh = True
+        self.stats.connects += 1
+
+    async def _async_close(self) -> None:
+        writer = self._writer
+        self._reader = self._writer = None
+        if writer is None:
+            return
+
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+    async def async_open(self) -> None:
+        """Open the connection ahead of a time critical request.
+
+        Failures only update the circuit breaker, the request itself will
+        report them.
+        """
+        async with self._lock:
+            if self.connected or not self.breaker.allow():
+                return
+
+            start = time.perf_counter()
+            try:
+                await self._async_connect()
+            except asyncio.CancelledError:
+                self.breaker.cancel_probe()
+                raise
+            except (OSError, asyncio.TimeoutError):
+                self.breaker.failure()
+                return
+
+            self.stats.connect.add(time.perf_counter() - start)
+            self.breaker.success()
+
+    async def async_close(self) -> None:
+        """Close the connection.
+
+        A status request in flight is cancelled, a command in flight is
+        sent first.
+        """
+        if self._status_request is not None:
+            self._status_request.cancel()
+        async with self._lock:
+            await self._async_close()
@@ -4,3 +4,84 @@ ATTR_MANUFACTURER = "BUTT"
 DEFAULT_NAME = ""
 DEFAULT_PORT = 1256
 DEFAULT_SCAN_INTERVAL = 15
+DEFAULT_MIN_SCAN_INTERVAL = 2
+DEFAULT_MAX_SCAN_INTERVAL = 120
+FAST_POLL_DURATION = 30
+DEFAULT_VU_SAMPLE_INTERVAL = 0
+DEFAULT_VU_WINDOW = 10
+
+CONF_MIN_SCAN_INTERVAL = "min_scan_interval"
+CONF_MAX_SCAN_INTERVAL = "max_scan_interval"
+CONF_VU_SAMPLE_INTERVAL = "vu_sample_interval"
+CONF_VU_WINDOW = "vu_window"
+CONF_CAPTURE = "capture"
+CONF_STATISTICS = "statistics"
+CONF_SKIP_SENSOR_STATISTICS = "skip_sensor_statistics"
+DEFAULT_MAX_REPLY_SIZE = 8192
+DEFAULT_MAX_CONCURRENT_POLLS = 10
+DEFAULT_RATE_WINDOW = 20
+# Minimum seconds the current rate is taken over
+DEFAULT_RATE_SPAN = 5
+
+DATA_FLEET = f"{DOMAIN}_fleet"
+DATA_SCHEDULED = f"{DOMAIN}_scheduled"
+
+CONF_NETWORK = "network"
+DISCOVERY_TIMEOUT = 1
+DEFAULT_DISCOVERY_CONCURRENCY = 64
+DISCOVERY_MAX_HOSTS = 1024
+
+STORAGE_VERSION = 1
+CACHE_SAVE_DELAY = 60
+
+CAPTURE_FLUSH_DELAY = 10
+DEFAULT_CAPTURE_SIZE = 10 * 1024 * 1024
+
+CMD_CONNECT = b"\x01"
+CMD_DISCONNECT = b"\x02"
+CMD_START_RECORD = b"\x03"
+CMD_STOP_RECORD = b"\x04"
+CMD_GET_STATUS = b"\x05"
+CMD_SPLIT_RECORD = b"\x06"
+
+# Commands accepted by the send_command service
+COMMANDS = {
+    "connect": CMD_CONNECT,
+    "disconnect": CMD_DISCONNECT,
+    "start_record": CMD_START_RECORD,
+    "stop_record": CMD_STOP_RECORD,
+    "split_record": CMD_SPLIT_RECORD,
+}
+
+SERVICE_SEND_COMMAND = "send_command"
+SERVICE_SCHEDULE_COMMAND = "schedule_command"
+SERVICE_SONG_HISTORY = "song_history"
+ATTR_COMMAND = "command"
+ATTR_TARGETS = "targets"
+ATTR_AT = "at"
+ATTR_COUNT = "count"
+DEFAULT_MAX_FANOUT = 50
+# Seconds before a scheduled command that the connections are opened
+SCHEDULE_PREWARM = 2
+
+# Event fired when a status bit changes, by status field
+EVENT_TYPES = {
+    "connected": f"{DOMAIN}_connected",
+    "connecting": f"{DOMAIN}_connecting",
+    "recording": f"{DOMAIN}_recording",
+    "signaldetected": f"{DOMAIN}_signal_detected",
+    "silencedetected": f"{DOMAIN}_silence_detected",
+}
+# Seconds a new bit value must hold before its event is fired
+DEFAULT_EVENT_DEBOUNCE = {
+    "connected": 0,
+    "connecting": 0,
+    "recording": 0,
+    "signaldetected": 5,
+    "silencedetected": 5,
+}
+CONF_EVENT_DEBOUNCE = "{}_debounce"
+
+EVENT_SONG_CHANGED = f"{DOMAIN}_song_changed"
+# Songs kept per server
+DEFAULT_SONG_HISTORY = 50
@@ -0,0 +1,183 @@
+"""Butt status packet decoder"""
+
+from __future__ import annotations
+
+import codecs
+import struct
+from typing import NamedTuple
+
+STATUS_CONNECTED = 0
+STATUS_CONNECTING = 1
+STATUS_RECORDING = 2
+STATUS_SIGNAL_DETECTED = 3
+STATUS_SILENCE_DETECTED = 4
+STATUS_EXTENDED_PACKET = 31
+STATUS_PACKET_VERSION = 3
+
+_STATUS = struct.Struct("<I")  # uint32 status bitfield
+_EXTENDED = struct.Struct(
+    "<"
+    "H"  # packet_version uint16
+    "h"  # volume_left int16
+    "h"  # volume_right int16
+    "I"  # stream_seconds uint32
+    "I"  # stream_kByte uint32
+    "I"  # record_seconds uint32
+    "I"  # record_kByte uint32
+    "H"  # song_length uint16
+    "H"  # rec_path_length uint16
+    "i"  # listeners int32
+)
+
+# song_length and rec_path_length inside the extended header
+_LENGTHS = struct.Struct("<HH")
+_LENGTHS_OFFSET = 22
+
+STATUS_SIZE = _STATUS.size
+EXTENDED_SIZE = _EXTENDED.size
+HEADER_SIZE = STATUS_SIZE + EXTENDED_SIZE
+
+_EXTENDED_MASK = 1 << STATUS_EXTENDED_PACKET
+_FLAG_BITS = (
+    STATUS_CONNECTED,
+    STATUS_CONNECTING,
+    STATUS_RECORDING,
+    STATUS_SIGNAL_DETECTED,
+    STATUS_SILENCE_DETECTED,
+)
+_FLAG_MASK = sum(1 << bit for bit in _FLAG_BITS)
+_UNKNOWN_MASK = ~(_FLAG_MASK | _EXTENDED_MASK) & 0xFFFFFFFF
+# All combinations of the five flag bits, indexed by (status & _FLAG_MASK)
+_FLAGS = tuple(
+    tuple(bool(value & (1 << bit)) for bit in _FLAG_BITS)
+    for value in range(_FLAG_MASK + 1)
+)
+
+
+class ButtStatus(NamedTuple):
+    """Decoded BUTT status packet."""
+
+    connected: bool
+    connecting: bool
+    recording: bool
+    signaldetected: bool
+    silencedetected: bool
+    extendedpacket: bool
+    packetversion: int | None = None
+    volumeleft: float | None = None
+    volumeright: float | None = None
+    streamseconds: int | None = None
+    streamkbytes: int | None = None
+    recordseconds: int | None = None
+    recordkbytes: int | None = None
+    song: str | None = None
+    recordpath: str | None = None
+    listeners: int | None = None
+
+
+# Status records without extended data, indexed like _FLAGS
+_BASIC = tuple(ButtStatus(*flags, False) for flags in _FLAGS)
+
+# Bypass the generated NamedTuple __new__ on the hot path
+_new_status = tuple.__new__
+_utf_8_decode = codecs.utf_8_decode
+
+
+def _decode_string(view: memoryview) -> str:
+    return _utf_8_decode(view, "replace")[0].rstrip("\x00")
+
+
+# Position of each field in the ButtStatus record
+FIELD_INDEX = {field: index for index, field in enumerate(ButtStatus._fields)}
+
+ALL_FIELDS = frozenset(ButtStatus._fields)
+NO_FIELDS = frozenset()
+
+
+def changed_fields(old: ButtStatus | None, new: ButtStatus | None) -> frozenset[str]:
+    """Return the names of the fields that differ between two records."""
+    if old is None or new is None:
+        return NO_FIELDS if old is new else ALL_FIELDS
+    if old == new:
+        return NO_FIELDS
+    return frozenset(
+        field
+        for field, old_value, new_value in zip(ButtStatus._fields, old, new)
+        if old_value != new_value
+    )
+
+
+def is_extended(status: bytes) -> bool:
+    """Return True if the status word announces an extended packet."""
+    return bool(_STATUS.unpack_from(status)[0] & _EXTENDED_MASK)
+
+
+def has_unknown_bits(status: bytes) -> bool:
+    """Return True if the status word sets bits BUTT does not define."""
+    return bool(_STATUS.unpack_from(status)[0] & _UNKNOWN_MASK)
+
+
+def payload_size(extended: bytes) -> int:
+    """Return the number of string bytes following an extended header."""
+    song_length, rec_path_length = _LENGTHS.unpack_from(extended, _LENGTHS_OFFSET)
+    return song_length + rec_path_length
+
+
+def decode_status(data: bytes) -> ButtStatus | None:
+    """Decode a BUTT status reply.
+
+    Returns None for an empty reply. Packet versions newer than
+    STATUS_PACKET_VERSION are decoded by their version 3 prefix.
+    """
+    if not data:
+        return None
+
+    view = memoryview(data)
+    if len(view) < _STATUS.size:
+        raise ValueError(f"Status packet too short ({len(view)} bytes)")
+
+    (status,) = _STATUS.unpack_from(view)
+
+    if not status & _EXTENDED_MASK:
+        return _BASIC[status & _FLAG_MASK]
+
+    if len(view) < HEADER_SIZE:
+        raise ValueError(f"Extended status packet too short ({len(view)} bytes)")
+
+    (
+        packet_version,
+        volume_left,
+        volume_right,
+        stream_seconds,
+        stream_kbyte,
+        record_seconds,
+        record_kbyte,
+        song_length,
+        rec_path_length,
+        listeners,
+    ) = _EXTENDED.unpack_from(view, _STATUS.size)
+
+    song_end = HEADER_SIZE + song_length
+    rec_path_end = song_end + rec_path_length
+    if len(view) < rec_path_end:
+        raise ValueError(
+            f"Status packet truncated ({len(view)} of {rec_path_end} bytes)"
+        )
+
+    return _new_status(
+        ButtStatus,
+        (
+            *_FLAGS[status & _FLAG_MASK],
+            True,
+            packet_version,
+            volume_left * 0.1,
+            volume_right * 0.1,
+            stream_seconds,
+            stream_kbyte,
+            record_seconds,
+            record_kbyte,
+            _decode_string(view[HEADER_SIZE:song_end]),
+            _decode_string(view[song_end:rec_path_end]),
+            listeners,
+        ),
+    )
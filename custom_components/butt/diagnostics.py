@@ -0,0 +1,29 @@
+"""Diagnostics support for BUTT."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .hub import ButtHub
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    hub: ButtHub = hass.data[DOMAIN][entry.data[CONF_NAME]]["hub"]
+
+    return {
+        "entry": {"data": dict(entry.data), "options": dict(entry.options)},
+        "status": hub.data._asdict() if hub.data is not None else None,
+        "breaker_state": hub.breaker_state,
+        "poll_interval": hub.poll_interval,
+        "command_latency": hub.command_latency,
+        "stats": hub.stats.as_dict(),
+        "song_history": hub.songs.recent(),
+    }
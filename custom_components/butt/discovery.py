@@ -0,0 +1,70 @@
+"""Butt server discovery"""
+
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+from collections.abc import Iterable
+
+from .connection import ButtConnection
+from .const import (
+    CMD_GET_STATUS,
+    DEFAULT_DISCOVERY_CONCURRENCY,
+    DISCOVERY_MAX_HOSTS,
+    DISCOVERY_TIMEOUT,
+)
+from .decoder import ButtStatus, decode_status, has_unknown_bits
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def discovery_hosts(network: str) -> list[str]:
+    """Return the hosts of a subnet, or of a comma separated host list.
+
+    Raises ValueError for an invalid or too large subnet.
+    """
+    if "/" not in network:
+        return [host.strip() for host in network.split(",") if host.strip()]
+
+    subnet = ipaddress.ip_network(network.strip(), strict=False)
+    if subnet.num_addresses > DISCOVERY_MAX_HOSTS + 2:
+        raise ValueError(f"{subnet} has more than {DISCOVERY_MAX_HOSTS} hosts")
+    return [str(host) for host in subnet.hosts()]
+
+
+async def async_probe(
+    host: str, port: int, timeout: float = DISCOVERY_TIMEOUT
+) -> ButtStatus | None:
+    """Return the status of a BUTT server, None if none answers."""
+    connection = ButtConnection(host, port, timeout=timeout)
+    try:
+        reply = await connection.async_request(CMD_GET_STATUS)
+        if reply and has_unknown_bits(reply):
+            # The first bytes of other services mostly read as a basic status
+            return None
+        return decode_status(reply)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+        return None
+    finally:
+        await connection.async_close()
+
+
+async def async_discover(
+    hosts: Iterable[str],
+    port: int,
+    concurrency: int = DEFAULT_DISCOVERY_CONCURRENCY,
+    timeout: float = DISCOVERY_TIMEOUT,
+) -> dict[str, ButtStatus]:
+    """Probe many hosts at once, return the status of those that answered."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _async_probe(host: str) -> ButtStatus | None:
+        async with semaphore:
+            return await async_probe(host, port, timeout)
+
+    hosts = list(hosts)
+    results = await asyncio.gather(*(_async_probe(host) for host in hosts))
+    found = {host: status for host, status in zip(hosts, results) if status is not None}
+    _LOGGER.debug("Found %d of %d probed hosts", len(found), len(hosts))
+    return found
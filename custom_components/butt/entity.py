@@ -0,0 +1,48 @@
+"""Butt base entity"""
+
+from __future__ import annotations
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .decoder import FIELD_INDEX
+from .hub import ButtHub
+
+
+class ButtEntity(CoordinatorEntity[ButtHub]):
+    """Common base of the BUTT sensors, binary sensors and buttons.
+
+    Name, unique id and device info are set once. The value is read from
+    the status record by its precomputed index, or from the hub by the
+    valueFunction of the description.
+    """
+
+    def __init__(self, hub: ButtHub, description: EntityDescription):
+        """Initialize the entity."""
+        super().__init__(coordinator=hub)
+
+        self.entity_description = description
+        self._attr_name = f"{hub.name} {description.name}"
+        self._attr_unique_id = f"{hub.name}_{description.key}"
+        self._attr_device_info = hub.device_info
+
+        self._key = description.key
+        self._index = FIELD_INDEX.get(description.key)
+        self._value_function = getattr(description, "valueFunction", None)
+
+    @property
+    def _value(self):
+        """Return the current value of the entity."""
+        if self._value_function is not None:
+            return self._value_function(self.coordinator)
+        data = self.coordinator.data
+        if data is None or self._index is None:
+            return None
+        return data[self._index]
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if the value or availability changed."""
+        if self.coordinator.availability_changed or self._key in self.coordinator.changed:
+            self.async_write_ha_state()
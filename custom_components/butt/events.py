@@ -0,0 +1,46 @@
+"""Butt status bit events"""
+
+from __future__ import annotations
+
+
+class BitDebouncer:
+    """Accept a new value of a status bit only once it held for a while.
+
+    A value that flips back before the debounce time passed is ignored, so
+    a flapping bit produces no transitions at all.
+    """
+
+    __slots__ = ("debounce", "state", "since", "_pending", "_pending_since")
+
+    def __init__(self, debounce: float):
+        self.debounce = debounce
+        self.state: bool | None = None
+        self.since = 0.0
+        self._pending: bool | None = None
+        self._pending_since = 0.0
+
+    def update(self, value: bool, now: float) -> tuple[bool, bool, float] | None:
+        """Feed a sample, return (old, new, duration of old) on a transition."""
+        if self.state is None:
+            self.state = value
+            self.since = now
+            return None
+
+        if value == self.state:
+            self._pending = None
+            return None
+
+        if self._pending is None:
+            self._pending = value
+            self._pending_since = now
+
+        if now - self._pending_since < self.debounce:
+            return None
+
+        old = self.state
+        # The new state started when it was first seen
+        duration = self._pending_since - self.since
+        self.state = value
+        self.since = self._pending_since
+        self._pending = None
+        return old, value, duration
@@ -0,0 +1,152 @@
+"""Butt Fleet"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+
+from .connection import ButtConnection
+from .const import DEFAULT_MAX_CONCURRENT_POLLS, DOMAIN
+
+if TYPE_CHECKING:
+    from .hub import ButtHub
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fractional part of the golden ratio, spreads phases evenly over an interval
+_PHASE_STEP = 0.6180339887498949
+
+
+class ButtFleet:
+    """Shared poll scheduler for all BUTT hubs.
+
+    Poll start times are staggered across the interval and the number of
+    status requests in flight is bounded. Hubs pointing at the same server
+    share one connection and one phase, so their polls coalesce into a
+    single status request.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        max_concurrent_polls: int = DEFAULT_MAX_CONCURRENT_POLLS,
+    ):
+        self.hass = hass
+        self._semaphore = asyncio.Semaphore(max_concurrent_polls)
+
+        self._connections: dict[tuple[str, int], ButtConnection] = {}
+        self._references: dict[tuple[str, int], int] = {}
+        self._phases: dict[tuple[str, int], float] = {}
+
+        self._due: dict[ButtHub, float] = {}
+        self._handles: dict[ButtHub, asyncio.TimerHandle] = {}
+        self._polling: dict[ButtHub, asyncio.Task] = {}
+        self._poll_soon: dict[ButtHub, float] = {}
+
+    @callback
+    def async_get_connection(self, host: str, port: int) -> ButtConnection:
+        """Return the shared connection to a server."""
+        key = (host, port)
+        if key not in self._connections:
+            self._connections[key] = ButtConnection(host, port)
+            self._phases[key] = (len(self._phases) * _PHASE_STEP) % 1
+            self._references[key] = 0
+        self._references[key] += 1
+        return self._connections[key]
+
+    async def async_release_connection(self, host: str, port: int) -> None:
+        """Release a connection returned by async_get_connection.
+
+        The last release closes the connection, after a command in flight
+        was sent.
+        """
+        key = (host, port)
+        self._references[key] -= 1
+        if self._references[key] > 0:
+            return
+
+        del self._references[key]
+        del self._phases[key]
+        await self._connections.pop(key).async_close()
+
+    @callback
+    def async_register(self, hub: ButtHub) -> None:
+        """Poll a hub right away, then at its staggered phase.
+
+        The first poll is the background refresh of a new entry. It runs
+        under the same concurrency bound as all other polls.
+        """
+        hub.fleet = self
+        self._async_schedule(hub, self.hass.loop.time())
+
+    def _next_slot(self, hub: ButtHub, after: float) -> float:
+        """Return the first poll time of a hub later than after.
+
+        Poll times lie on a grid of the poll interval, shifted by the
+        phase of the server. The grid is anchored at loop time 0, so hubs
+        of the same server poll at the same moments no matter when they
+        were registered, and their status requests coalesce.
+        """
+        interval = hub.poll_interval
+        offset = self._phases.get((hub.host, hub.port), 0.0) * interval
+        return (math.floor((after - offset) / interval) + 1) * interval + offset
+
+    @callback
+    def async_unregister(self, hub: ButtHub) -> None:
+        """Stop polling a hub and cancel a poll in flight."""
+        hub.fleet = None
+        self._due.pop(hub, None)
+        self._poll_soon.pop(hub, None)
+        if handle := self._handles.pop(hub, None):
+            handle.cancel()
+        if task := self._polling.pop(hub, None):
+            task.cancel()
+
+    @callback
+    def async_poll_soon(self, hub: ButtHub, delay: float) -> None:
+        """Poll a hub after delay seconds unless it is due earlier."""
+        if hub not in self._due:
+            return
+
+        when = self.hass.loop.time() + delay
+        if hub in self._polling:
+            self._poll_soon[hub] = min(when, self._poll_soon.get(hub, when))
+        elif when < self._due[hub]:
+            self._async_schedule(hub, when)
+
+    @callback
+    def _async_schedule(self, hub: ButtHub, when: float) -> None:
+        if handle := self._handles.pop(hub, None):
+            handle.cancel()
+        self._due[hub] = when
+        self._handles[hub] = self.hass.loop.call_at(when, self._async_start_poll, hub)
+
+    @callback
+    def _async_start_poll(self, hub: ButtHub) -> None:
+        self._handles.pop(hub, None)
+        self._polling[hub] = self.hass.async_create_background_task(
+            self._async_poll(hub), f"{DOMAIN} poll {hub.name}"
+        )
+
+    async def _async_poll(self, hub: ButtHub) -> None:
+        try:
+            async with self._semaphore:
+                await hub.async_refresh()
+        finally:
+            if self._polling.get(hub) is asyncio.current_task():
+                del self._polling[hub]
+
+        if hub not in self._due:
+            return
+
+        # Keep the phase of the hub, skip polls that were missed entirely
+        now = self.hass.loop.time()
+        when = self._next_slot(hub, now)
+        if (soon := self._poll_soon.pop(hub, None)) is not None:
+            when = min(when, max(soon, now))
+
+        self._async_schedule(hub, when)
@@ -1,20 +1,78 @@
 """Butt Hub"""
 
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from voluptuous.validators import Number
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.storage import Store
 import logging
-import threading
-from datetime import timedelta
-from homeassistant.core import CALLBACK_TYPE, callback
+import time
+from typing import NamedTuple
+from homeassistant.core import callback
 import asyncio
-import struct
+
+from .breaker import BreakerState, CircuitOpenError
+from .capture import StatusCapture
+from .connection import ButtConnection
+from .events import BitDebouncer
+from .fleet import ButtFleet
+from .longterm import HourlyStatistics
+from .rates import RateTracker
+from .songs import SongHistory
+from .vu import VuSummary, VuWindow
+from .const import (
+    ATTR_MANUFACTURER,
+    CACHE_SAVE_DELAY,
+    DEFAULT_EVENT_DEBOUNCE,
+    CMD_CONNECT,
+    CMD_DISCONNECT,
+    CMD_GET_STATUS,
+    CMD_SPLIT_RECORD,
+    CMD_START_RECORD,
+    CMD_STOP_RECORD,
+    DEFAULT_MAX_SCAN_INTERVAL,
+    DEFAULT_MIN_SCAN_INTERVAL,
+    DEFAULT_VU_SAMPLE_INTERVAL,
+    DEFAULT_VU_WINDOW,
+    DOMAIN,
+    EVENT_SONG_CHANGED,
+    EVENT_TYPES,
+    FAST_POLL_DURATION,
+)
+from .decoder import NO_FIELDS, ButtStatus, changed_fields, decode_status
 
 _LOGGER = logging.getLogger(__name__)
 
+STREAM_RATE_FIELDS = frozenset(("streambitrate", "streambitrateaverage"))
+RECORD_RATE_FIELDS = frozenset(("recordbitrate", "recordbitrateaverage"))
+
+VOLUME_FIELDS = frozenset(("volumeleft", "volumeright"))
+CONNECTION_FIELDS = frozenset(("ipaddress", "port"))
+BREAKER_FIELDS = frozenset(("breakerstate",))
+
+# Diagnostic sensor keys that are refreshed with every poll
+STATS_FIELDS = frozenset(
+    (
+        "polllatency",
+        "pollrequests",
+        "polltimeouts",
+        "pollfailures",
+        "bytesread",
+    )
+)
+
+
+class CommandResult(NamedTuple):
+    """Outcome of a command sent together with a status request."""
 
-class ButtHub(DataUpdateCoordinator[dict]):
-    """Thread safe wrapper class for pymodbus."""
+    sent: bool
+    # Seconds until the command was written
+    latency: float | None
+    status: ButtStatus | None
+
+
+class ButtHub(DataUpdateCoordinator[ButtStatus | None]):
+    """Coordinator that polls and commands one BUTT server."""
 
     def __init__(
         self,
@@ -23,161 +81,478 @@ class ButtHub(DataUpdateCoordinator[dict]):
         host: str,
         port: Number,
         scan_interval: Number,
+        min_scan_interval: Number = DEFAULT_MIN_SCAN_INTERVAL,
+        max_scan_interval: Number = DEFAULT_MAX_SCAN_INTERVAL,
+        connection: ButtConnection | None = None,
+        vu_sample_interval: float = DEFAULT_VU_SAMPLE_INTERVAL,
+        vu_window: float = DEFAULT_VU_WINDOW,
+        store: Store | None = None,
+        event_debounce: dict[str, float] | None = None,
+        capture: StatusCapture | None = None,
+        statistics: HourlyStatistics | None = None,
     ):
-        """Initialize the Modbus hub."""
+        """Initialize the BUTT hub."""
         super().__init__(
             hass,
             _LOGGER,
             name=name,
-            update_interval=timedelta(seconds=scan_interval),
+            # Polls are scheduled by the ButtFleet
+            update_interval=None,
         )
 
-        # self._client = ModbusTcpClient(host=host, port=port, timeout=5)
         self.host = host
         self.port = port
-        self._lock = threading.Lock()
+        # Shared by all entities of this hub
+        self.device_info = DeviceInfo(
+            identifiers={(DOMAIN, name)},
+            name=name,
+            manufacturer=ATTR_MANUFACTURER,
+        )
+        self._connection = connection or ButtConnection(host, port)
+        self.fleet: ButtFleet | None = None
+        self.stats = self._connection.stats
+        # Cache of the last known status, used until the first poll answered
+        self._store = store
+        # Optional log of the raw status replies
+        self.capture = capture
+        # Optional hourly aggregation imported as long-term statistics
+        self.statistics = statistics
+        # Bitrates in kbit/s derived from the kByte counters
+        self.stream_rate = RateTracker()
+        self.record_rate = RateTracker()
+
+        # Entries saved before the intervals were validated may hold 0
+        self.scan_interval = scan_interval = max(scan_interval, 1)
+        self.min_scan_interval = max(min(min_scan_interval, scan_interval), 1)
+        self.max_scan_interval = max(max_scan_interval, scan_interval)
+        self._interval = scan_interval
+        self._fast_poll_until = 0.0
+
+        # High rate volume sampling, disabled if the interval is 0
+        self.vu_sample_interval = vu_sample_interval
+        self.vu_window = vu_window
+        self.vu: dict[str, VuSummary] = {}
+        self._vu_sampler: asyncio.Task | None = None
+
+        event_debounce = {**DEFAULT_EVENT_DEBOUNCE, **(event_debounce or {})}
+        self._debouncers = {key: BitDebouncer(event_debounce[key]) for key in EVENT_TYPES}
+        self.songs = SongHistory()
+
+        # Commands waiting to be sent, in order, with their futures
+        self._commands: list[tuple[bytes, asyncio.Future]] = []
+        self._command_worker: asyncio.Task | None = None
+        self._command_queued_at: float | None = None
+        self._command_batch_sent = False
+        # Seconds from the first queued command to the refreshed state
+        self.command_latency: float | None = None
+        # Status reply read together with a command, used by the next refresh
+        self._pipelined_reply: bytes | None = None
+
+        self.data: ButtStatus | None = None
+        # data was read by the last poll, not restored or kept from before
+        self._status_fresh = False
+        # Status fields that changed with the last refresh
+        self.changed: frozenset[str] = NO_FIELDS
+        # Entities became available or unavailable with the last refresh
+        self.availability_changed = False
+        # Breaker state the entities last saw
+        self._published_breaker_state: BreakerState | None = None
 
-        self.data: dict = {}
+    @callback
+    def async_set_connection(self, host: str, port: int, connection: ButtConnection) -> None:
+        """Switch to another server without recreating the hub."""
+        self.host = host
+        self.port = port
+        self._connection = connection
+        self.stats = connection.stats
+        # The counters of the new server are unrelated to the old ones
+        self.stream_rate.reset()
+        self.record_rate.reset()
+        self._status_fresh = False
+        self.changed = CONNECTION_FIELDS | STREAM_RATE_FIELDS | RECORD_RATE_FIELDS
+        self.async_update_listeners()
 
     @callback
-    def async_remove_listener(self, update_callback: CALLBACK_TYPE) -> None:
-        """Remove data update listener."""
-        super().async_remove_listener(update_callback)
+    def async_set_scan_interval(
+        self, scan_interval: Number, min_scan_interval: Number, max_scan_interval: Number
+    ) -> None:
+        """Change the poll intervals, the next poll uses the new interval."""
+        # Entries saved before the intervals were validated may hold 0
+        self.scan_interval = scan_interval = max(scan_interval, 1)
+        self.min_scan_interval = max(min(min_scan_interval, scan_interval), 1)
+        self.max_scan_interval = max(max_scan_interval, scan_interval)
+        self._set_interval(scan_interval)
+
+    async def async_restore_status(self) -> None:
+        """Restore the last known status from the cache."""
+        if self._store is None or (cached := await self._store.async_load()) is None:
+            return
+        try:
+            self.data = ButtStatus(**cached)
+        except TypeError:
+            _LOGGER.debug("Ignoring outdated status cache of %s", self.name)
 
-        """No listeners left then close connection"""
-        if not self._listeners:
-            self.close()
+    def _cached_status(self) -> dict | None:
+        return self.data._asdict() if self.data is not None else None
 
-    def close(self) -> None:
-        """Disconnect client."""
-        with self._lock:
-            self._client.close()
+    @callback
+    def async_start_vu_sampler(self) -> None:
+        """Start sampling the volume if enabled."""
+        if self.vu_sample_interval and self._vu_sampler is None:
+            self._vu_sampler = self.hass.async_create_background_task(
+                self._async_sample_vu(), f"butt vu {self.name}"
+            )
+
+    @callback
+    def async_stop_vu_sampler(self) -> None:
+        """Stop sampling the volume."""
+        if self._vu_sampler is not None:
+            self._vu_sampler.cancel()
+            self._vu_sampler = None
+
+    async def _async_sample_vu(self) -> None:
+        """Sample the volume and publish a summary per window."""
+        windows = {key: VuWindow() for key in VOLUME_FIELDS}
+        loop = self.hass.loop
+        window_end = loop.time() + self.vu_window
+
+        while True:
+            try:
+                result = await self._connection.async_request(CMD_GET_STATUS)
+                if self.capture is not None:
+                    self.capture.async_add(result)
+                status = decode_status(result)
+            except Exception:  # Unreachable, the regular poll reports it
+                status = None
+
+            if status is not None and status.extendedpacket:
+                windows["volumeleft"].add(status.volumeleft)
+                windows["volumeright"].add(status.volumeright)
+
+            if loop.time() >= window_end:
+                window_end += self.vu_window
+                changed = set()
+                for key, window in windows.items():
+                    summary = window.summary()
+                    window.reset()
+                    if summary != self.vu.get(key):
+                        changed.add(key)
+                        if summary is None:
+                            self.vu.pop(key, None)
+                        else:
+                            self.vu[key] = summary
+                if changed:
+                    self.changed = frozenset(changed)
+                    # The last poll already published its availability
+                    self.availability_changed = False
+                    self.async_update_listeners()
+
+            await asyncio.sleep(self.vu_sample_interval)
+
+    def volume(self, key: str) -> float | None:
+        """Return the window mean of a volume, the last sample without VU sampling."""
+        if summary := self.vu.get(key):
+            return round(summary.mean, 1)
+        return getattr(self.data, key, None)
+
+    def volume_attributes(self, key: str) -> dict | None:
+        """Return the window summary of a volume."""
+        if summary := self.vu.get(key):
+            return summary.as_attributes()
+        return None
+
+    def _next_interval(self, status: ButtStatus | None) -> float:
+        """Return the poll interval that suits the current server state."""
+        interval = self._interval
+
+        if status is None:
+            # Unreachable, back off hard
+            return min(max(interval, self.scan_interval) * 4, self.max_scan_interval)
+
+        if (
+            status.connecting
+            or status.recording
+            or status.silencedetected
+            or time.monotonic() < self._fast_poll_until
+        ):
+            return self.min_scan_interval
+
+        if status.connected:
+            return self.scan_interval
+
+        # Idle, slow down
+        return min(max(interval, self.scan_interval) * 2, self.max_scan_interval)
+
+    @property
+    def breaker_state(self) -> BreakerState:
+        """Return the state of the circuit breaker of the connection."""
+        return self._connection.breaker.state
+
+    @property
+    def poll_interval(self) -> float:
+        """Return the current poll interval in seconds."""
+        return self._interval
+
+    def _set_interval(self, interval: float) -> None:
+        if interval != self._interval:
+            _LOGGER.debug("Poll %s every %ss", self.name, interval)
+            self._interval = interval
+
+    async def async_send_command(self, command, with_status: bool = False):
+        """Send a command, return its reply or None if it failed.
+
+        With with_status the status is read after the command and
+        (seconds until the command was sent, status reply or None) is
+        returned.
+        """
+        if command != CMD_GET_STATUS:
+            self._fast_poll_until = time.monotonic() + FAST_POLL_DURATION
+            self._set_interval(self.min_scan_interval)
+            if self.fleet:
+                self.fleet.async_poll_soon(self, self.min_scan_interval)
+
+        # Failed polls are reported once per outage by the coordinator
+        log = _LOGGER.debug if command == CMD_GET_STATUS else _LOGGER.error
 
-    async def async_send_command(self, command, host, port):
         data = None
         try:
-            conn = asyncio.open_connection(host, port)
-            reader, writer = await asyncio.wait_for(conn, 3)
-
-            writer.write(command)
-            await writer.drain()
+            if with_status:
+                data = await self._connection.async_request_with_status(command)
+            else:
+                data = await self._connection.async_request(command)
+        except CircuitOpenError as e:
+            log(e)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            log(f"Timout error! BUTT Server ({self.name}) is unreachable.")
+        except Exception:
+            self.stats.failures += 1
+            log(f"Reading data failed! BUTT Server ({self.name}) is unreachable.")
 
-            data = await reader.read(1024)
+        return data
 
-            writer.close()
-            await writer.wait_closed()
-        except asyncio.TimeoutError as e:
-            _LOGGER.error(f"Timout error! BUTT Server ({self.name}) is unreachable.")
-        except Exception as e:
-            _LOGGER.error(
-                f"Reading data failed! BUTT Server ({self.name}) is unreachable."
+    async def async_prepare_command(self) -> None:
+        """Open the connection so a following command is sent without delay."""
+        await self._connection.async_open()
+
+    async def async_send_now(self, command: bytes) -> CommandResult:
+        """Send a command right away, bypassing the queue."""
+        return await self.async_send_with_status(command)
+
+    async def async_send_with_status(self, command: bytes) -> CommandResult:
+        """Send a command and read the resulting status in the same round-trip.
+
+        The status is also applied like a regular poll, in the background,
+        so entities and events see it right away.
+        """
+        result = await self.async_send_command(command, with_status=True)
+        if result is None:
+            return CommandResult(False, None, None)
+
+        latency, reply = result
+        status = None
+        if reply is not None:
+            try:
+                status = decode_status(reply)
+            except ValueError:
+                status = None
+            else:
+                self._pipelined_reply = reply
+                self.hass.async_create_task(self.async_refresh())
+        return CommandResult(True, latency, status)
+
+    def _command_redundant(self, command: bytes) -> bool:
+        """Return True if the last polled status makes the command a no-op.
+
+        A status restored from the cache or kept while the server fails
+        may be stale, the command is sent then.
+        """
+        status = self.data
+        if status is None or not self._status_fresh:
+            return False
+        if command == CMD_CONNECT:
+            return status.connected or status.connecting
+        if command == CMD_START_RECORD:
+            return status.recording
+        return False
+
+    async def async_queue_command(self, command: bytes) -> None:
+        """Queue a command and wait until it was sent.
+
+        Commands are sent in order, a command that is already waiting in
+        the queue is not queued twice. The status is refreshed once the
+        queue has drained.
+        """
+        for queued, future in self._commands:
+            if queued == command:
+                _LOGGER.debug("Coalesce command %s for %s", command, self.name)
+                await asyncio.shield(future)
+                return
+
+        if self._command_queued_at is None:
+            self._command_queued_at = time.monotonic()
+
+        future = self.hass.loop.create_future()
+        self._commands.append((command, future))
+        if self._command_worker is None:
+            self._command_worker = self.hass.async_create_background_task(
+                self._async_run_commands(), f"butt commands {self.name}"
             )
+        await asyncio.shield(future)
 
-        if data is None:
-            data = b""
+    async def _async_run_commands(self) -> None:
+        refreshed = False
+        try:
+            while self._commands:
+                command, future = self._commands.pop(0)
+                if self._command_redundant(command):
+                    _LOGGER.debug("Skip redundant command %s for %s", command, self.name)
+                elif self._commands:
+                    await self.async_send_command(command)
+                else:
+                    # The last command brings the status along
+                    self._command_batch_sent = True
+                    refreshed = (
+                        await self.async_send_with_status(command)
+                    ).status is not None
+                future.set_result(None)
+        finally:
+            self._command_worker = None
+
+        if not refreshed:
+            self._command_batch_sent = True
+            await self.async_request_refresh()
+
+    async def _async_update_data(self) -> ButtStatus | None:
+        status = None
+        error = None
+        try:
+            status = await self.async_read_data()
+        except UpdateFailed as err:
+            error = err
+
+        self.availability_changed = self.last_update_success != (error is None)
+        self._status_fresh = error is None
+
+        if status is not None:
+            self._fire_events(status)
+            if self.statistics is not None and self.statistics.add(status):
+                self.hass.async_create_background_task(
+                    self.statistics.async_import(), f"butt statistics {self.name}"
+                )
 
-        return data
+        if self._store is not None and status is not None and status != self.data:
+            self._store.async_delay_save(self._cached_status, CACHE_SAVE_DELAY)
 
-    async def _async_update_data(self) -> dict:
-        data = {}
-        try:
-            data = await self.hass.async_add_executor_job(self.read_data)
-        except Exception as e:
-            _LOGGER.error(e)
+        self.changed = (
+            changed_fields(self.data, status) | STATS_FIELDS | self._update_rates(status)
+        )
+        if (breaker_state := self.breaker_state) != self._published_breaker_state:
+            self._published_breaker_state = breaker_state
+            self.changed |= BREAKER_FIELDS
+        if self.vu_sample_interval:
+            # Volumes are published per window by the sampler
+            self.changed -= VOLUME_FIELDS
+        self._set_interval(self._next_interval(status))
+
+        if self._command_batch_sent and self._command_queued_at is not None:
+            self._command_batch_sent = False
+            self.command_latency = time.monotonic() - self._command_queued_at
+            self._command_queued_at = None
+            _LOGGER.debug(
+                "Command to state latency for %s: %.3fs", self.name, self.command_latency
+            )
 
-        return {**data}
+        if error is not None:
+            raise error
+        return status
+
+    def _fire_events(self, status: ButtStatus) -> None:
+        """Fire an event for every debounced status bit transition and song change."""
+        now = time.monotonic()
+        for key, debouncer in self._debouncers.items():
+            if transition := debouncer.update(getattr(status, key), now):
+                old, new, duration = transition
+                self.hass.bus.async_fire(
+                    EVENT_TYPES[key],
+                    {
+                        "name": self.name,
+                        "old": old,
+                        "new": new,
+                        "duration": round(duration, 1),
+                    },
+                )
+
+        if status.extendedpacket and (
+            change := self.songs.update(status.song, time.time())
+        ):
+            old, new, duration = change
+            self.hass.bus.async_fire(
+                EVENT_SONG_CHANGED,
+                {
+                    "name": self.name,
+                    "old": old,
+                    "new": new,
+                    "duration": round(duration, 1),
+                },
+            )
+
+    def _update_rates(self, status: ButtStatus | None) -> frozenset[str]:
+        """Feed the kByte counters into the rate trackers.
+
+        Returns the keys of the rate sensors that changed.
+        """
+        if status is None or not status.extendedpacket:
+            if self.stream_rate.current is None and self.record_rate.current is None:
+                return NO_FIELDS
+            self.stream_rate.reset()
+            self.record_rate.reset()
+            return STREAM_RATE_FIELDS | RECORD_RATE_FIELDS
+
+        now = time.monotonic()
+        changed = NO_FIELDS
+        if self.stream_rate.add(now, status.streamkbytes * 8):
+            changed |= STREAM_RATE_FIELDS
+        if self.record_rate.add(now, status.recordkbytes * 8):
+            changed |= RECORD_RATE_FIELDS
+        return changed
 
     async def connect(self):
         _LOGGER.info("Connect...")
-        await self.async_send_command(b"\x01", self.host, self.port)
+        await self.async_queue_command(CMD_CONNECT)
 
     async def disconnect(self):
         _LOGGER.info("Disconnect...")
-        await self.async_send_command(b"\x02", self.host, self.port)
+        await self.async_queue_command(CMD_DISCONNECT)
 
     async def start_record(self):
         _LOGGER.info("Start recording...")
-        await self.async_send_command(b"\x03", self.host, self.port)
+        await self.async_queue_command(CMD_START_RECORD)
 
     async def stop_record(self):
         _LOGGER.info("Stop recording...")
-        await self.async_send_command(b"\x04", self.host, self.port)
+        await self.async_queue_command(CMD_STOP_RECORD)
 
     async def split_record(self):
         _LOGGER.info("Split recording...")
-        await self.async_send_command(b"\x06", self.host, self.port)
-
-    def read_data(self) -> dict:
-
-        data = {}
-
-        data["ipaddress"] = self.host
-        data["port"] = self.port
-
-        result = asyncio.run(self.async_send_command(b"\x05", self.host, self.port))
-
-        if len(result) == 0:
-            return data
-
-        STATUS_CONNECTED = 0
-        STATUS_CONNECTING = 1
-        STATUS_RECORDING = 2
-        STATUS_SIGNAL_DETECTED = 3
-        STATUS_SILENCE_DETECTED = 4
-        STATUS_EXTENDED_PACKET = 31
-        STATUS_PACKET_VERSION = 3
-
-        (status,) = struct.unpack("<I", result[:4])  # uint32 -> I 4
-        status_connected: bool = (status & (1 << STATUS_CONNECTED)) > 0
-        status_connecting: bool = (status & (1 << STATUS_CONNECTING)) > 0
-        status_recording: bool = (status & (1 << STATUS_RECORDING)) > 0
-        status_signal_detected: bool = (status & (1 << STATUS_SIGNAL_DETECTED)) > 0
-        status_silence_detected: bool = (status & (1 << STATUS_SILENCE_DETECTED)) > 0
-        status_extended_packet: bool = (status & (1 << STATUS_EXTENDED_PACKET)) > 0
-
-        data["connected"] = status_connected
-        data["connecting"] = status_connecting
-        data["recording"] = status_recording
-        data["signaldetected"] = status_signal_detected
-        data["silencedetected"] = status_silence_detected
-        data["extendedpacket"] = status_extended_packet
-
-        if status_extended_packet:
-            (
-                packet_version,  # uint16 -> H 2
-                volume_left,  # int16 h 2
-                volume_right,  # int16 h 2
-                stream_seconds,  # uint32 -> I 4
-                stream_kByte,  # uint32 -> I 4
-                record_seconds,  # uint32 -> I 4
-                record_kByte,  # uint32 -> I 4
-                song_length,  # uint16 -> H 2
-                rec_path_length,  # uint16 -> H 2
-                listeners,  # int32 -> i 4
-            ) = struct.unpack("<HhhIIIIHHi", result[4:34])
-
-            if song_length > 0:
-                song = struct.unpack(f"{song_length}s", result[34 : 34 + song_length])
-            else:
-                song = ""
+        await self.async_queue_command(CMD_SPLIT_RECORD)
+
+    async def async_read_data(self) -> ButtStatus | None:
+        if (result := self._pipelined_reply) is not None:
+            self._pipelined_reply = None
+        else:
+            result = await self.async_send_command(CMD_GET_STATUS)
+        if result is None:
+            raise UpdateFailed(f"BUTT Server ({self.name}) is unreachable")
+        if self.capture is not None:
+            self.capture.async_add(result)
+
+        start = time.perf_counter()
+        try:
+            status = decode_status(result)
+        except ValueError as err:
+            raise UpdateFailed(f"Invalid status from BUTT Server ({self.name}): {err}")
+        self.stats.decode.add(time.perf_counter() - start)
 
-            if rec_path_length > 0:
-                rec_path = struct.unpack(
-                    f"{rec_path_length}s",
-                    result[34 + song_length : 34 + song_length + rec_path_length],
-                )
-            else:
-                rec_path = ""
-
-            data["streamseconds"] = stream_seconds
-            data["streamkbytes"] = stream_kByte
-            data["recordseconds"] = record_seconds
-            data["recordkbytes"] = record_kByte
-            data["volumeleft"] = volume_left * 0.1
-            data["volumeright"] = volume_right * 0.1
-            data["song"] = song[0].rstrip(b"\x00").decode("utf-8")
-            data["recordpath"] = rec_path[0].rstrip(b"\x00").decode("utf-8")
-            data["listeners"] = listeners
-            data["packetversion"] = packet_version
+        return status
 
-        return data
@@ -0,0 +1,153 @@
+"""Butt hourly long-term statistics"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.const import UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import DOMAIN
+from .decoder import ButtStatus
+from .vu import VuWindow
+
+_LOGGER = logging.getLogger(__name__)
+
+# Status fields aggregated to hourly min, max and mean
+MEAN_FIELDS = ("listeners", "volumeleft", "volumeright")
+# Status counters aggregated to the seconds they advanced per hour
+SUM_FIELDS = ("streamseconds", "recordseconds")
+
+_NAMES = {
+    "listeners": "Listeners",
+    "volumeleft": "Volume Left",
+    "volumeright": "Volume Right",
+    "streamseconds": "Stream Seconds",
+    "recordseconds": "Record Seconds",
+}
+
+
+class CounterDelta:
+    """Amount a counter advanced, a counter that restarts counts from zero."""
+
+    __slots__ = ("last", "total")
+
+    def __init__(self):
+        self.last: int | None = None
+        self.total = 0
+
+    def add(self, value: int) -> None:
+        """Add a sample of the counter."""
+        if self.last is not None:
+            self.total += value - self.last if value >= self.last else value
+        self.last = value
+
+
+class HourlyStatistics:
+    """Aggregate the status per hour and import it as external statistics.
+
+    Samples only update running aggregates. When an hour is complete one
+    row per statistic is queued, and all queued rows are imported in one
+    call per statistic. The hour in progress is lost on a restart.
+    """
+
+    def __init__(self, hass: HomeAssistant, name: str):
+        self.hass = hass
+        self.statistic_ids = {
+            key: f"{DOMAIN}:{slugify(name)}_{key}" for key in MEAN_FIELDS + SUM_FIELDS
+        }
+        self._hour: datetime | None = None
+        self._windows = {key: VuWindow() for key in MEAN_FIELDS}
+        self._counters = {key: CounterDelta() for key in SUM_FIELDS}
+        # Last imported cumulative sums, loaded from the recorder once
+        self._sums: dict[str, float] | None = None
+        self._rows: dict[str, list[StatisticData]] = {
+            key: [] for key in self.statistic_ids
+        }
+        self._metadata = {
+            key: StatisticMetaData(
+                has_mean=key in MEAN_FIELDS,
+                has_sum=key in SUM_FIELDS,
+                name=f"{name} {_NAMES[key]}",
+                source=DOMAIN,
+                statistic_id=statistic_id,
+                unit_of_measurement=UnitOfTime.SECONDS if key in SUM_FIELDS else None,
+            )
+            for key, statistic_id in self.statistic_ids.items()
+        }
+
+    def add(self, status: ButtStatus) -> bool:
+        """Add a sample, return True if an hour was completed."""
+        hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+        completed = False
+        if self._hour is not None and hour != self._hour:
+            completed = self._complete_hour()
+        self._hour = hour
+
+        if not status.extendedpacket:
+            return completed
+        for key, window in self._windows.items():
+            window.add(getattr(status, key))
+        for key, counter in self._counters.items():
+            counter.add(getattr(status, key))
+        return completed
+
+    def _complete_hour(self) -> bool:
+        """Queue the rows of the finished hour and start a new one."""
+        queued = False
+        for key, window in self._windows.items():
+            if summary := window.summary():
+                self._rows[key].append(
+                    StatisticData(
+                        start=self._hour,
+                        mean=summary.mean,
+                        min=summary.minimum,
+                        max=summary.maximum,
+                    )
+                )
+                queued = True
+            window.reset()
+        for key, counter in self._counters.items():
+            if counter.last is not None:
+                self._rows[key].append(
+                    # The sum is made cumulative on import
+                    StatisticData(start=self._hour, state=counter.total, sum=counter.total)
+                )
+                queued = True
+            counter.total = 0
+        return queued
+
+    async def _async_load_sums(self) -> dict[str, float]:
+        sums = {}
+        for key in SUM_FIELDS:
+            statistic_id = self.statistic_ids[key]
+            last = await get_instance(self.hass).async_add_executor_job(
+                get_last_statistics, self.hass, 1, statistic_id, True, {"sum"}
+            )
+            rows = last.get(statistic_id)
+            sums[key] = (rows[0].get("sum") or 0.0) if rows else 0.0
+        return sums
+
+    async def async_import(self) -> None:
+        """Import the rows of the completed hours."""
+        if self._sums is None:
+            self._sums = await self._async_load_sums()
+
+        for key, rows in self._rows.items():
+            if not rows:
+                continue
+            if key in self._sums:
+                for row in rows:
+                    self._sums[key] += row["sum"]
+                    row["sum"] = self._sums[key]
+            async_add_external_statistics(self.hass, self._metadata[key], rows)
+            _LOGGER.debug("Imported %d hours of %s", len(rows), self.statistic_ids[key])
+            self._rows[key] = []
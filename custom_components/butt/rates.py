@@ -0,0 +1,84 @@
+"""Butt counter rates"""
+
+from __future__ import annotations
+
+from array import array
+
+from .const import DEFAULT_RATE_SPAN, DEFAULT_RATE_WINDOW
+
+
+class RateTracker:
+    """Rates of a cumulative counter from a fixed-size ring of samples.
+
+    The current rate is taken from the newest sample back to the newest
+    one that is at least span seconds older, so samples only milliseconds
+    apart (a refresh right after a command) don't turn the 1 kByte
+    resolution of the counters into spikes. The average is taken over the
+    whole ring. A counter that goes backwards
+    (a new stream or recording started) restarts the ring instead of
+    producing a negative or spiking rate.
+    """
+
+    __slots__ = (
+        "_times",
+        "_values",
+        "_size",
+        "_span",
+        "_index",
+        "_count",
+        "current",
+        "average",
+    )
+
+    def __init__(self, size: int = DEFAULT_RATE_WINDOW, span: float = DEFAULT_RATE_SPAN):
+        # Unboxed doubles, a fraction of the size of lists of floats
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        self._size = size
+        self._span = span
+        self._index = -1
+        self._count = 0
+        self.current: float | None = None
+        self.average: float | None = None
+
+    def reset(self) -> None:
+        """Forget all samples."""
+        self._index = -1
+        self._count = 0
+        self.current = None
+        self.average = None
+
+    def add(self, timestamp: float, value: float) -> bool:
+        """Add a sample and return True if a rate changed."""
+        old = (self.current, self.average)
+        if self._count and value < self._values[self._index]:
+            self.reset()
+
+        self._index = (self._index + 1) % self._size
+        self._times[self._index] = timestamp
+        self._values[self._index] = value
+        self._count = min(self._count + 1, self._size)
+
+        if self._count >= 2:
+            oldest = (self._index + 1) % self._size if self._count == self._size else 0
+            if (start := self._span_start()) is not None:
+                self.current = self._rate(start, self._index)
+            self.average = self._rate(oldest, self._index)
+
+        return (self.current, self.average) != old
+
+    def _span_start(self) -> int | None:
+        """Return the newest sample at least span seconds before the newest."""
+        newest = self._times[self._index]
+        index = self._index
+        for _ in range(self._count - 1):
+            index = (index - 1) % self._size
+            if newest - self._times[index] >= self._span:
+                return index
+        return None
+
+    def _rate(self, start: int, end: int) -> float | None:
+        elapsed = self._times[end] - self._times[start]
+        if elapsed <= 0:
+            return None
+        return round((self._values[end] - self._values[start]) / elapsed, 1)
@@ -0,0 +1,81 @@
+"""Butt status capture replay
+
+Runs without Home Assistant, as a script next to the decoder:
+
+    python custom_components/butt/replay.py <capture>...
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import time
+from collections.abc import Iterator
+
+if __package__:
+    from .decoder import decode_status
+else:  # Run as a script, the decoder is imported from the same directory
+    from decoder import decode_status
+
+MAGIC = b"BUTTCAP1"
+# Monotonic timestamp (float64) and payload length (uint32) of a record
+RECORD = struct.Struct("<dI")
+
+
+def iter_capture(path: str) -> Iterator[tuple[float, memoryview]]:
+    """Yield (timestamp, raw reply) of a capture without copying the replies.
+
+    Each reply is a view into the mapped file that is released when the
+    next record is read, copy it with bytes() to keep it.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # Created, but nothing was flushed yet
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from _iter_records(path, mapped)
+
+
+def _iter_records(path: str, mapped: mmap.mmap) -> Iterator[tuple[float, memoryview]]:
+    view = memoryview(mapped)
+    try:
+        if mapped[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a BUTT capture")
+
+        offset = len(MAGIC)
+        end = len(view)
+        while offset + RECORD.size <= end:
+            timestamp, length = RECORD.unpack_from(view, offset)
+            offset += RECORD.size
+            if offset + length > end:
+                # Truncated last record
+                break
+            record = view[offset : offset + length]
+            try:
+                yield timestamp, record
+            finally:
+                record.release()
+            offset += length
+    finally:
+        view.release()
+
+
+def replay(path: str) -> tuple[int, float]:
+    """Decode all replies of a capture, return the count and the seconds taken."""
+    count = 0
+    start = time.perf_counter()
+    for _, payload in iter_capture(path):
+        decode_status(payload)
+        count += 1
+    return count, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    for capture_path in sys.argv[1:]:
+        replies, seconds = replay(capture_path)
+        print(
+            f"{capture_path}: {replies} replies in {seconds:.3f}s "
+            f"({replies / seconds if seconds else 0:.0f}/s)"
+        )
@@ -1,7 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from datetime import datetime
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from dataclasses import dataclass, field, replace
 from homeassistant.components.sensor import (
     SensorEntity,
     SensorEntityDescription,
@@ -9,88 +7,72 @@ from homeassistant.components.sensor import (
     SensorStateClass,
     SensorDeviceClass,
 )
-from homeassistant.const import UnitOfTime, UnitOfInformation
+from homeassistant.const import UnitOfDataRate, UnitOfTime, UnitOfInformation
 import logging
-from typing import Optional
+from typing import Callable, Optional
 
 from homeassistant.const import CONF_NAME
-from homeassistant.core import callback
-import homeassistant.util.dt as dt_util
 
-from .const import (
-    ATTR_MANUFACTURER,
-    DOMAIN,
-)
-
-from .hub import ButtHub
+from .breaker import BreakerState
+from .const import CONF_SKIP_SENSOR_STATISTICS, DOMAIN
+from .entity import ButtEntity
+from .longterm import MEAN_FIELDS
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
-    hub_name = entry.data[CONF_NAME]
-    hub = hass.data[DOMAIN][hub_name]["hub"]
-
-    device_info = {
-        "identifiers": {(DOMAIN, hub_name)},
-        "name": hub_name,
-        "manufacturer": ATTR_MANUFACTURER,
-    }
-
-    entities = []
-    for sensor_description in SENSOR_TYPES.values():
-        sensor = ButtSensor(
-            hub_name,
+    hub = hass.data[DOMAIN][entry.data[CONF_NAME]]["hub"]
+    skip_sensor_statistics = entry.options.get(CONF_SKIP_SENSOR_STATISTICS, False)
+
+    async_add_entities(
+        ButtSensor(
             hub,
-            device_info,
-            sensor_description,
+            # Without a state class the recorder compiles no statistics,
+            # the hourly import covers them
+            replace(sensor_description, state_class=None)
+            if skip_sensor_statistics and sensor_description.key in MEAN_FIELDS
+            else sensor_description,
         )
-        entities.append(sensor)
-
-    async_add_entities(entities)
+        for sensor_description in SENSOR_TYPES.values()
+    )
     return True
 
 
-class ButtSensor(CoordinatorEntity, SensorEntity):
+class ButtSensor(ButtEntity, SensorEntity):
     """Representation of an Butt sensor."""
 
-    def __init__(
-        self,
-        platform_name: str,
-        hub: ButtHub,
-        device_info,
-        description: ButtSensorEntityDescription,
-    ):
-        """Initialize the sensor."""
-        self._platform_name = platform_name
-        self._attr_device_info = device_info
-        self.entity_description: ButtSensorEntityDescription = description
-
-        super().__init__(coordinator=hub)
+    entity_description: ButtSensorEntityDescription
+    # The VU window summaries of the volumes change with every window
+    _unrecorded_attributes = frozenset({"min", "max", "mean", "rms", "samples"})
 
     @property
-    def name(self):
-        """Return the name."""
-        return f"{self._platform_name} {self.entity_description.name}"
-
-    @property
-    def unique_id(self) -> Optional[str]:
-        return f"{self._platform_name}_{self.entity_description.key}"
+    def available(self) -> bool:
+        """Return True if the entity is available."""
+        return self.entity_description.alwaysAvailable or super().available
 
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        return (
-            self.coordinator.data[self.entity_description.key]
-            if self.entity_description.key in self.coordinator.data
-            else None
-        )
+        return self._value
+
+    @property
+    def extra_state_attributes(self):
+        """Return the state attributes of the sensor."""
+        if self.entity_description.attributesFunction:
+            return self.entity_description.attributesFunction(self.coordinator)
+        return None
 
 
 @dataclass
 class ButtSensorEntityDescription(SensorEntityDescription):
     """A class that describes Zoonneplan sensor entities."""
 
+    valueFunction: Optional[Callable] = field(default=None)
+    attributesFunction: Optional[Callable] = field(default=None)
+    # Keeps reporting while the server is unreachable
+    alwaysAvailable: bool = field(default=False)
+
 
 SENSOR_TYPES: dict[str, list[ButtSensorEntityDescription]] = {
     "StreamSeconds": ButtSensorEntityDescription(
@@ -127,12 +109,54 @@ SENSOR_TYPES: dict[str, list[ButtSensorEntityDescription]] = {
         # state_class=SensorStateClass.MEASUREMENT,
         entity_registry_enabled_default=True,
     ),
+    "StreamBitrate": ButtSensorEntityDescription(
+        name="Stream Bitrate",
+        key="streambitrate",
+        icon="mdi:speedometer",
+        device_class=SensorDeviceClass.DATA_RATE,
+        native_unit_of_measurement=UnitOfDataRate.KILOBITS_PER_SECOND,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=True,
+        valueFunction=lambda hub: hub.stream_rate.current,
+    ),
+    "StreamBitrateAverage": ButtSensorEntityDescription(
+        name="Stream Bitrate Average",
+        key="streambitrateaverage",
+        icon="mdi:speedometer",
+        device_class=SensorDeviceClass.DATA_RATE,
+        native_unit_of_measurement=UnitOfDataRate.KILOBITS_PER_SECOND,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=True,
+        valueFunction=lambda hub: hub.stream_rate.average,
+    ),
+    "RecordBitrate": ButtSensorEntityDescription(
+        name="Record Bitrate",
+        key="recordbitrate",
+        icon="mdi:speedometer",
+        device_class=SensorDeviceClass.DATA_RATE,
+        native_unit_of_measurement=UnitOfDataRate.KILOBITS_PER_SECOND,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=True,
+        valueFunction=lambda hub: hub.record_rate.current,
+    ),
+    "RecordBitrateAverage": ButtSensorEntityDescription(
+        name="Record Bitrate Average",
+        key="recordbitrateaverage",
+        icon="mdi:speedometer",
+        device_class=SensorDeviceClass.DATA_RATE,
+        native_unit_of_measurement=UnitOfDataRate.KILOBITS_PER_SECOND,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=True,
+        valueFunction=lambda hub: hub.record_rate.average,
+    ),
     "VolumeLeft": ButtSensorEntityDescription(
         name="Volume Left",
         key="volumeleft",
         icon="mdi:volume-high",
         state_class=SensorStateClass.MEASUREMENT,
         entity_registry_enabled_default=True,
+        valueFunction=lambda hub: hub.volume("volumeleft"),
+        attributesFunction=lambda hub: hub.volume_attributes("volumeleft"),
     ),
     "VolumeRight": ButtSensorEntityDescription(
         name="Volume Right",
@@ -140,6 +164,8 @@ SENSOR_TYPES: dict[str, list[ButtSensorEntityDescription]] = {
         icon="mdi:volume-high",
         state_class=SensorStateClass.MEASUREMENT,
         entity_registry_enabled_default=True,
+        valueFunction=lambda hub: hub.volume("volumeright"),
+        attributesFunction=lambda hub: hub.volume_attributes("volumeright"),
     ),
     "Song": ButtSensorEntityDescription(
         name="Song",
@@ -168,11 +194,76 @@ SENSOR_TYPES: dict[str, list[ButtSensorEntityDescription]] = {
     "IpAddress": ButtSensorEntityDescription(
         name="IP Address",
         key="ipaddress",
+        valueFunction=lambda hub: hub.host,
         entity_category=EntityCategory.DIAGNOSTIC,
     ),
     "Port": ButtSensorEntityDescription(
         name="port",
         key="port",
+        valueFunction=lambda hub: hub.port,
+        entity_category=EntityCategory.DIAGNOSTIC,
+    ),
+    "PollLatency": ButtSensorEntityDescription(
+        name="Poll Latency",
+        key="polllatency",
+        icon="mdi:timer-outline",
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        valueFunction=lambda hub: (
+            round(hub.stats.request.last * 1000, 1)
+            if hub.stats.request.last is not None
+            else None
+        ),
+    ),
+    "BreakerState": ButtSensorEntityDescription(
+        name="Connection State",
+        key="breakerstate",
+        icon="mdi:electric-switch",
+        device_class=SensorDeviceClass.ENUM,
+        options=[state.value for state in BreakerState],
+        entity_category=EntityCategory.DIAGNOSTIC,
+        valueFunction=lambda hub: hub.breaker_state.value,
+        alwaysAvailable=True,
+    ),
+    "PollRequests": ButtSensorEntityDescription(
+        name="Poll Requests",
+        key="pollrequests",
+        icon="mdi:counter",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        valueFunction=lambda hub: hub.stats.requests,
+    ),
+    "PollTimeouts": ButtSensorEntityDescription(
+        name="Poll Timeouts",
+        key="polltimeouts",
+        icon="mdi:timer-alert-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        valueFunction=lambda hub: hub.stats.timeouts,
+    ),
+    "PollFailures": ButtSensorEntityDescription(
+        name="Poll Failures",
+        key="pollfailures",
+        icon="mdi:alert-circle-outline",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        valueFunction=lambda hub: hub.stats.failures,
+    ),
+    "BytesRead": ButtSensorEntityDescription(
+        name="Bytes Read",
+        key="bytesread",
+        icon="mdi:download-network-outline",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        state_class=SensorStateClass.TOTAL_INCREASING,
         entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        valueFunction=lambda hub: hub.stats.bytes_read,
     ),
 }
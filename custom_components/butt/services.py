@@ -0,0 +1,238 @@
+"""Butt services"""
+
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+import logging
+import time
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.util.dt as dt_util
+
+from .const import (
+    ATTR_AT,
+    ATTR_COMMAND,
+    ATTR_COUNT,
+    ATTR_TARGETS,
+    COMMANDS,
+    DATA_SCHEDULED,
+    DEFAULT_MAX_FANOUT,
+    DEFAULT_SONG_HISTORY,
+    DOMAIN,
+    SCHEDULE_PREWARM,
+    SERVICE_SCHEDULE_COMMAND,
+    SERVICE_SEND_COMMAND,
+    SERVICE_SONG_HISTORY,
+)
+from .hub import ButtHub
+
+_LOGGER = logging.getLogger(__name__)
+
+SEND_COMMAND_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_COMMAND): vol.In(list(COMMANDS)),
+        vol.Optional(ATTR_TARGETS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+SCHEDULE_COMMAND_SCHEMA = SEND_COMMAND_SCHEMA.extend(
+    {vol.Required(ATTR_AT): cv.datetime}
+)
+
+SONG_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_COUNT, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=DEFAULT_SONG_HISTORY + 1)
+        ),
+        vol.Optional(ATTR_TARGETS): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+
+def _get_hubs(hass: HomeAssistant, targets: list[str] | None) -> dict[str, ButtHub]:
+    """Return the hubs by name, all hubs if no targets are given."""
+    hubs = {name: entry["hub"] for name, entry in hass.data[DOMAIN].items()}
+    if targets is None:
+        return hubs
+
+    if unknown := [name for name in targets if name not in hubs]:
+        raise ServiceValidationError(f"Unknown BUTT servers: {', '.join(unknown)}")
+    return {name: hubs[name] for name in targets}
+
+
+def _by_server(hubs: dict[str, ButtHub]) -> dict[tuple[str, int], list[str]]:
+    """Group the hub names by server, hubs of one server share a connection."""
+    servers: dict[tuple[str, int], list[str]] = {}
+    for name, hub in hubs.items():
+        servers.setdefault((hub.host, hub.port), []).append(name)
+    return servers
+
+
+async def _async_prepare_all(hubs: dict[str, ButtHub]) -> None:
+    """Open the connections to all servers."""
+    semaphore = asyncio.Semaphore(DEFAULT_MAX_FANOUT)
+
+    async def _async_prepare(hub: ButtHub) -> None:
+        async with semaphore:
+            await hub.async_prepare_command()
+
+    await asyncio.gather(
+        *(_async_prepare(hubs[names[0]]) for names in _by_server(hubs).values())
+    )
+
+
+async def _async_send_all(hubs: dict[str, ButtHub], command: bytes) -> dict:
+    """Send a command to all servers at once, return success and send latency per hub."""
+    semaphore = asyncio.Semaphore(DEFAULT_MAX_FANOUT)
+
+    async def _async_send(hub: ButtHub) -> dict:
+        async with semaphore:
+            result = await hub.async_send_now(command)
+            return {
+                "success": result.sent,
+                # Until the command was written, the status read is not included
+                "latency": (
+                    round(result.latency * 1000, 1) if result.latency is not None else None
+                ),
+            }
+
+    # A server with several entries gets the command once
+    servers = _by_server(hubs)
+    results = await asyncio.gather(
+        *(_async_send(hubs[names[0]]) for names in servers.values())
+    )
+    return {
+        name: result
+        for names, result in zip(servers.values(), results)
+        for name in names
+    }
+
+
+async def _async_send_command(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Send a command to many BUTT servers at the same time."""
+    command = COMMANDS[call.data[ATTR_COMMAND]]
+    hubs = _get_hubs(hass, call.data.get(ATTR_TARGETS))
+
+    # Connect first, so the commands go out back to back on open sockets
+    await _async_prepare_all(hubs)
+    return {"results": await _async_send_all(hubs, command)}
+
+
+async def _async_sleep_until(timestamp: float) -> None:
+    """Sleep until a wall clock timestamp.
+
+    The remaining time is measured against the wall clock again shortly
+    before the deadline, which corrects for event loop lag and for drift
+    between the loop clock and the wall clock during long waits.
+    """
+    while (remaining := timestamp - time.time()) > 0.05:
+        await asyncio.sleep(remaining - 0.05 if remaining > 1 else remaining / 2)
+    if remaining > 0:
+        await asyncio.sleep(remaining)
+
+
+async def _async_run_scheduled(
+    hass: HomeAssistant, targets: list[str] | None, name: str, timestamp: float
+) -> None:
+    """Send a scheduled command.
+
+    The hubs are looked up when they are needed, an entry may have been
+    reloaded since the call. Unloading a target cancels the command.
+    """
+    command = COMMANDS[name]
+
+    await _async_sleep_until(timestamp - SCHEDULE_PREWARM)
+    await _async_prepare_all(_get_hubs(hass, targets))
+
+    await _async_sleep_until(timestamp)
+    skew = time.time() - timestamp
+    results = await _async_send_all(_get_hubs(hass, targets), command)
+
+    for hub_name, result in results.items():
+        if result["success"]:
+            _LOGGER.info(
+                "Scheduled %s sent to %s, %.1f ms after the target",
+                name,
+                hub_name,
+                skew * 1000 + result["latency"],
+            )
+        else:
+            _LOGGER.error("Scheduled %s for %s failed", name, hub_name)
+
+
+async def _async_schedule_command(hass: HomeAssistant, call: ServiceCall) -> None:
+    """Send a command to many BUTT servers at an exact time."""
+    # Naive times are local time
+    at = dt_util.as_utc(call.data[ATTR_AT])
+    timestamp = at.timestamp()
+    if timestamp <= time.time():
+        raise ServiceValidationError(f"{at.isoformat()} is in the past")
+
+    targets = call.data.get(ATTR_TARGETS)
+    # Fails early for unknown servers
+    _get_hubs(hass, targets)
+    scheduled: dict[asyncio.Task, list[str] | None] = hass.data[DATA_SCHEDULED]
+    task = hass.async_create_background_task(
+        _async_run_scheduled(hass, targets, call.data[ATTR_COMMAND], timestamp),
+        f"{DOMAIN} scheduled {call.data[ATTR_COMMAND]} at {at.isoformat()}",
+    )
+    scheduled[task] = targets
+    task.add_done_callback(scheduled.pop)
+
+
+@callback
+def async_cancel_scheduled(hass: HomeAssistant, name: str) -> None:
+    """Cancel the scheduled commands for an unloaded server.
+
+    Commands for all servers are sent to the servers loaded at the time.
+    """
+    for task, targets in hass.data[DATA_SCHEDULED].items():
+        if targets is not None and name in targets:
+            _LOGGER.warning("Scheduled command for %s cancelled, it was unloaded", name)
+            task.cancel()
+
+
+async def _async_song_history(
+    hass: HomeAssistant, call: ServiceCall
+) -> ServiceResponse:
+    """Return the latest songs of BUTT servers."""
+    hubs = _get_hubs(hass, call.data.get(ATTR_TARGETS))
+    count = call.data[ATTR_COUNT]
+    return {"songs": {name: hub.songs.recent(count) for name, hub in hubs.items()}}
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the BUTT services."""
+    hass.data[DATA_SCHEDULED] = {}
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SEND_COMMAND,
+        partial(_async_send_command, hass),
+        schema=SEND_COMMAND_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SCHEDULE_COMMAND,
+        partial(_async_schedule_command, hass),
+        schema=SCHEDULE_COMMAND_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SONG_HISTORY,
+        partial(_async_song_history, hass),
+        schema=SONG_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,89 @@
+"""Butt song history"""
+
+from __future__ import annotations
+
+import sys
+from collections import deque
+from typing import NamedTuple
+
+import homeassistant.util.dt as dt_util
+
+from .const import DEFAULT_SONG_HISTORY
+
+
+class SongEntry(NamedTuple):
+    """A song that was played."""
+
+    title: str
+    start: float
+    duration: float
+
+    def as_dict(self) -> dict:
+        """Return the entry for service responses and diagnostics."""
+        return {
+            "title": self.title,
+            "start": dt_util.utc_from_timestamp(self.start).isoformat(),
+            "duration": round(self.duration, 1),
+        }
+
+
+class SongHistory:
+    """The current song and a fixed-size ring of the songs played before.
+
+    A title is only recorded when it differs from the current one, so
+    polling the same song does not grow the history. Titles are interned,
+    a song that is played again shares the string of its earlier entries.
+    """
+
+    __slots__ = ("_entries", "_size", "title", "since")
+
+    def __init__(self, size: int = DEFAULT_SONG_HISTORY):
+        # Created with the first finished song, servers without song
+        # titles don't pay for the ring
+        self._entries: deque[SongEntry] | None = None
+        self._size = size
+        self.title: str | None = None
+        self.since: float | None = None
+
+    def update(
+        self, title: str | None, now: float
+    ) -> tuple[str | None, str | None, float] | None:
+        """Feed the polled title, return (old, new, duration of old) on a change.
+
+        An empty title ends the current song without starting a new one.
+        The first title is taken as is, without a change.
+        """
+        title = sys.intern(title) if title else None
+        if self.since is None:
+            self.title = title
+            self.since = now
+            return None
+        if title == self.title:
+            return None
+
+        old = self.title
+        duration = now - self.since
+        if old is not None:
+            if self._entries is None:
+                self._entries = deque(maxlen=self._size)
+            self._entries.append(SongEntry(old, self.since, duration))
+        self.title = title
+        self.since = now
+        return old, title, duration
+
+    def recent(self, count: int | None = None) -> list[dict]:
+        """Return the latest songs first, the current one without an end."""
+        songs = []
+        if self.title is not None and self.since is not None:
+            songs.append(
+                {
+                    "title": self.title,
+                    "start": dt_util.utc_from_timestamp(self.since).isoformat(),
+                    "duration": None,
+                }
+            )
+        for entry in reversed(self._entries or ()):
+            if count is not None and len(songs) >= count:
+                break
+            songs.append(entry.as_dict())
+        return songs[:count]
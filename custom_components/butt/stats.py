@@ -0,0 +1,87 @@
+"""Butt request statistics"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+
+# Upper bounds of the latency buckets in seconds, the last bucket is open
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "total", "last")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.last: float | None = None
+
+    def add(self, value: float) -> None:
+        """Add a sample in seconds."""
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.last = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of all samples in seconds."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict:
+        """Return the histogram for diagnostics."""
+        buckets = {f"<={bound}": count for bound, count in zip(LATENCY_BUCKETS, self.counts)}
+        buckets[f">{LATENCY_BUCKETS[-1]}"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "last": self.last,
+            "buckets": buckets,
+        }
+
+
+class ButtStats:
+    """Timing and counters of the requests to one BUTT server."""
+
+    __slots__ = (
+        "connect",
+        "write",
+        "first_byte",
+        "read",
+        "decode",
+        "request",
+        "connects",
+        "requests",
+        "bytes_read",
+        "timeouts",
+        "failures",
+    )
+
+    PHASES = ("connect", "write", "first_byte", "read", "decode", "request")
+
+    def __init__(self):
+        self.connect = Histogram()
+        self.write = Histogram()
+        self.first_byte = Histogram()
+        self.read = Histogram()
+        self.decode = Histogram()
+        self.request = Histogram()
+        self.connects = 0
+        self.requests = 0
+        self.bytes_read = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def as_dict(self) -> dict:
+        """Return the statistics for diagnostics."""
+        return {
+            "connects": self.connects,
+            "requests": self.requests,
+            "bytes_read": self.bytes_read,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            **{phase: getattr(self, phase).as_dict() for phase in self.PHASES},
+        }
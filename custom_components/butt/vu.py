@@ -0,0 +1,71 @@
+"""Butt VU meter aggregation"""
+
+from __future__ import annotations
+
+import math
+from typing import NamedTuple
+
+
+class VuSummary(NamedTuple):
+    """Summary of the volume samples of one window."""
+
+    minimum: float
+    maximum: float
+    mean: float
+    rms: float
+    samples: int
+
+    def as_attributes(self) -> dict:
+        """Return the summary as entity attributes."""
+        return {
+            "min": round(self.minimum, 1),
+            "max": round(self.maximum, 1),
+            "mean": round(self.mean, 1),
+            "rms": round(self.rms, 1),
+            "samples": self.samples,
+        }
+
+
+class VuWindow:
+    """Running min, max, mean and RMS of volume samples.
+
+    Volumes are levels in dB. The RMS level is taken over their linear
+    power and reported in dB again.
+    """
+
+    __slots__ = ("count", "total", "power", "minimum", "maximum")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a new window."""
+        self.count = 0
+        self.total = 0.0
+        self.power = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value: float) -> None:
+        """Add a sample."""
+        self.count += 1
+        self.total += value
+        self.power += 10 ** (value / 10)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def summary(self) -> VuSummary | None:
+        """Return the summary of the window, None if it has no samples."""
+        if not self.count:
+            return None
+        # The power of levels below about -3000 dB underflows to 0
+        rms = 10 * math.log10(self.power / self.count) if self.power else self.maximum
+        return VuSummary(
+            self.minimum,
+            self.maximum,
+            self.total / self.count,
+            rms,
+            self.count,
+        )
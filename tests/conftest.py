@@ -0,0 +1,55 @@
+"""Fixtures for the BUTT tests."""
+
+from __future__ import annotations
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.butt.const import DOMAIN
+
+from .fake_butt import FakeButtServer
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integration from custom_components."""
+    yield
+
+
+@pytest.fixture(autouse=True)
+def auto_socket_enabled(socket_enabled):
+    """Allow the loopback connections to the fake servers."""
+    yield
+
+
+@pytest.fixture
+async def butt_server():
+    """Return a running fake BUTT server."""
+    async with FakeButtServer() as server:
+        yield server
+
+
+@pytest.fixture
+async def butt_entry(hass: HomeAssistant, butt_server: FakeButtServer):
+    """Return a loaded config entry of the fake server."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="studio",
+        unique_id="studio",
+        data={
+            CONF_NAME: "studio",
+            CONF_HOST: butt_server.host,
+            CONF_PORT: butt_server.port,
+            CONF_SCAN_INTERVAL: 15,
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    yield entry
+    if entry.state is ConfigEntryState.LOADED:
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
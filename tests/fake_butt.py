@@ -0,0 +1,198 @@
+"""Fake BUTT server for tests and benchmarks.
+
+Implements the command opcodes and the status packet (version 3) as
+described in the README, independent of the integration's decoder.
+Knobs simulate slow, fragmenting and unreliable servers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import struct
+import time
+
+CMD_CONNECT = 0x01
+CMD_DISCONNECT = 0x02
+CMD_START_RECORD = 0x03
+CMD_STOP_RECORD = 0x04
+CMD_GET_STATUS = 0x05
+CMD_SPLIT_RECORD = 0x06
+
+EXTENDED = 1 << 31
+
+
+class FakeButtServer:
+    """Asyncio BUTT command server on a loopback port.
+
+    latency
+        Seconds before each status reply.
+    fragment
+        Send replies in chunks of this many bytes, fragment_delay apart.
+    drop_status
+        Number of following status requests answered by closing the
+        connection instead.
+    drop_after_command
+        Number of following commands (not status requests) after which
+        the connection is closed, once the command ran.
+    one_opcode_per_connection
+        Handle a single opcode per connection, then close it, like
+        servers that don't keep connections alive.
+    extended
+        Send extended packets with the fields below.
+    """
+
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        fragment: int | None = None,
+        fragment_delay: float = 0.0,
+        one_opcode_per_connection: bool = False,
+        extended: bool = True,
+        host: str = "127.0.0.1",
+    ):
+        self.latency = latency
+        self.fragment = fragment
+        self.fragment_delay = fragment_delay
+        self.drop_status = 0
+        self.drop_after_command = 0
+        self.one_opcode_per_connection = one_opcode_per_connection
+        self.extended = extended
+
+        self.connected = False
+        self.connecting = False
+        self.recording = False
+        self.signal = True
+        self.silence = False
+        self.volume_left = -12.5
+        self.volume_right = -11.0
+        self.stream_seconds = 0
+        self.stream_kbytes = 0
+        self.record_seconds = 0
+        self.record_kbytes = 0
+        self.song = ""
+        self.record_path = ""
+        self.listeners = 0
+
+        # Every opcode received, in order, and its wall clock arrival time
+        self.received: list[int] = []
+        self.received_at: list[float] = []
+        self.splits = 0
+        self.connections = 0
+        self.open_connections = 0
+        self.peak_connections = 0
+
+        self.host = host
+        self.port: int | None = None
+        self._server: asyncio.Server | None = None
+        self._handlers: set[asyncio.Task] = set()
+
+    async def start(self, port: int = 0) -> FakeButtServer:
+        """Listen on the port, a free one by default."""
+        self._server = await asyncio.start_server(self._handle, self.host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        """Close the listener and all connections."""
+        self._server.close()
+        for handler in list(self._handlers):
+            handler.cancel()
+        await asyncio.gather(*self._handlers)
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> FakeButtServer:
+        return await self.start()
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    def status_packet(self) -> bytes:
+        """Return the status packet of the current state."""
+        bits = (
+            self.connected
+            | self.connecting << 1
+            | self.recording << 2
+            | self.signal << 3
+            | self.silence << 4
+        )
+        if not self.extended:
+            return struct.pack("<I", bits)
+
+        song = self.song.encode()
+        record_path = self.record_path.encode()
+        return (
+            struct.pack(
+                "<IHhhIIIIHHi",
+                bits | EXTENDED,
+                3,
+                round(self.volume_left * 10),
+                round(self.volume_right * 10),
+                self.stream_seconds,
+                self.stream_kbytes,
+                self.record_seconds,
+                self.record_kbytes,
+                len(song),
+                len(record_path),
+                self.listeners,
+            )
+            + song
+            + record_path
+        )
+
+    def _run(self, opcode: int) -> None:
+        if opcode == CMD_CONNECT:
+            self.connected = True
+        elif opcode == CMD_DISCONNECT:
+            self.connected = False
+        elif opcode == CMD_START_RECORD:
+            self.recording = True
+        elif opcode == CMD_STOP_RECORD:
+            self.recording = False
+        elif opcode == CMD_SPLIT_RECORD:
+            self.splits += 1
+
+    async def _reply(self, writer: asyncio.StreamWriter) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        packet = self.status_packet()
+        if not self.fragment:
+            writer.write(packet)
+            await writer.drain()
+            return
+        for start in range(0, len(packet), self.fragment):
+            writer.write(packet[start : start + self.fragment])
+            await writer.drain()
+            await asyncio.sleep(self.fragment_delay)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.open_connections += 1
+        self.peak_connections = max(self.peak_connections, self.open_connections)
+        self._handlers.add(handler := asyncio.current_task())
+        try:
+            while opcode := await reader.read(1):
+                opcode = opcode[0]
+                self.received.append(opcode)
+                self.received_at.append(time.time())
+
+                if opcode == CMD_GET_STATUS:
+                    if self.drop_status:
+                        self.drop_status -= 1
+                        break
+                    await self._reply(writer)
+                else:
+                    self._run(opcode)
+                    if self.drop_after_command:
+                        self.drop_after_command -= 1
+                        break
+
+                if self.one_opcode_per_connection:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            # Stopped, end the handler quietly for the stream callback
+            pass
+        finally:
+            self._handlers.discard(handler)
+            self.open_connections -= 1
+            writer.close()
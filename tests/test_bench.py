@@ -0,0 +1,442 @@
+"""Benchmarks against the fake BUTT server.
+
+Deselected by default, run with ``pytest -m bench -s`` to see the numbers.
+The asserts only check that the runs worked, compare the printed numbers
+before and after a change.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import resource
+import statistics
+import time
+import timeit
+import tracemalloc
+
+import pytest
+from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.butt.connection import ButtConnection
+from custom_components.butt.const import (
+    CMD_GET_STATUS,
+    CMD_SPLIT_RECORD,
+    DEFAULT_MAX_CONCURRENT_POLLS,
+    DOMAIN,
+)
+from custom_components.butt.decoder import decode_status
+from custom_components.butt.fleet import ButtFleet
+from custom_components.butt.hub import ButtHub
+
+from .fake_butt import FakeButtServer
+
+pytestmark = pytest.mark.bench
+
+
+@pytest.fixture(autouse=True)
+def enable_event_loop_debug(event_loop: asyncio.AbstractEventLoop) -> None:
+    """Time the loop as it runs in production, without debug mode."""
+    event_loop.set_debug(False)
+
+
+def _percentile(samples: list[float], percent: int) -> float:
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+def _report(name: str, **values: float) -> None:
+    print(f"\n{name}: " + ", ".join(f"{key}={value:.4g}" for key, value in values.items()))
+
+
+def _hub(hass: HomeAssistant, server: FakeButtServer, name: str = "butt") -> ButtHub:
+    # Each hub gets its own connection, as if it pointed at its own server
+    return ButtHub(
+        hass,
+        name,
+        server.host,
+        server.port,
+        10,
+        connection=ButtConnection(server.host, server.port),
+    )
+
+
+def _raise_open_files(files: int) -> tuple[int, int]:
+    """Allow at least files open files, return the limits to restore."""
+    soft, hard = limits = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and hard < files:
+        pytest.skip(f"needs {files} open files")
+    resource.setrlimit(resource.RLIMIT_NOFILE, (max(soft, files), hard))
+    return limits
+
+
+def _entry(hass: HomeAssistant, name: str, host: str, port: int) -> MockConfigEntry:
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=name,
+        unique_id=name,
+        data={CONF_NAME: name, CONF_HOST: host, CONF_PORT: port, CONF_SCAN_INTERVAL: 15},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def test_poll_latency(hass: HomeAssistant, butt_server: FakeButtServer) -> None:
+    """Time of a full poll: request, decode and coordinator update."""
+    butt_server.song = "Artist – Title"
+    hub = _hub(hass, butt_server)
+    await hub.async_refresh()
+
+    samples = []
+    for _ in range(500):
+        start = time.perf_counter()
+        await hub.async_refresh()
+        samples.append(time.perf_counter() - start)
+
+    assert hub.last_update_success
+    _report(
+        "poll latency [ms]",
+        p50=_percentile(samples, 50) * 1000,
+        p95=_percentile(samples, 95) * 1000,
+        max=max(samples) * 1000,
+    )
+    await hub._connection.async_close()
+
+
+@pytest.mark.parametrize("count", [1, 10, 100, 1000])
+async def test_throughput(hass: HomeAssistant, count: int) -> None:
+    """Polls per second with many hubs due at the same moment.
+
+    Polls run under the concurrency bound of the fleet.
+    """
+    # Both ends of every kept-alive connection live in this process
+    limits = _raise_open_files(2 * count + 100)
+
+    rounds = 5
+    semaphore = asyncio.Semaphore(DEFAULT_MAX_CONCURRENT_POLLS)
+
+    async def poll(hub: ButtHub) -> None:
+        async with semaphore:
+            await hub.async_refresh()
+
+    async with FakeButtServer() as server:
+        hubs = [_hub(hass, server, f"butt{index}") for index in range(count)]
+        await asyncio.gather(*(poll(hub) for hub in hubs))
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            await asyncio.gather(*(poll(hub) for hub in hubs))
+        elapsed = time.perf_counter() - start
+
+        assert all(hub.last_update_success for hub in hubs)
+        _report(
+            f"throughput with {count} hubs",
+            polls_per_second=count * rounds / elapsed,
+            round_ms=elapsed / rounds * 1000,
+        )
+        await asyncio.gather(*(hub._connection.async_close() for hub in hubs))
+    resource.setrlimit(resource.RLIMIT_NOFILE, limits)
+
+
+@pytest.mark.parametrize(
+    ("name", "extended", "length"),
+    [("basic", False, 0), ("extended", True, 20), ("long strings", True, 4000)],
+)
+def test_decode_cost(name: str, extended: bool, length: int) -> None:
+    """Time to decode one status packet."""
+    server = FakeButtServer(extended=extended)
+    server.song = "S" * length
+    server.record_path = "/" * length
+    packet = server.status_packet()
+
+    number, total = timeit.Timer(lambda: decode_status(packet)).autorange()
+
+    _report(f"decode {name} ({len(packet)} bytes) [µs]", per_packet=total / number * 1e6)
+
+
+async def test_memory_per_hub(hass: HomeAssistant, butt_server: FakeButtServer) -> None:
+    """Memory held by a hub after its first poll."""
+    count = 100
+    butt_server.song = "Artist – Title"
+    hubs = []
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for index in range(count):
+        hub = _hub(hass, butt_server, f"butt{index}")
+        await hub.async_refresh()
+        hubs.append(hub)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    _report("memory per hub [kB]", size=size / count / 1024)
+    await asyncio.gather(*(hub._connection.async_close() for hub in hubs))
+
+
+async def test_memory_per_entity(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """Memory of the entities of an entry, beyond that of its hub.
+
+    The entries share one server, like the bare hubs measured first.
+    """
+    count = 100
+    butt_server.song = "Artist – Title"
+    connection = ButtConnection(butt_server.host, butt_server.port)
+    hubs = []
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for index in range(count):
+        hub = ButtHub(
+            hass,
+            f"hub{index}",
+            butt_server.host,
+            butt_server.port,
+            15,
+            connection=connection,
+        )
+        await hub.async_refresh()
+        hubs.append(hub)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    hub_size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del hubs
+    await connection.async_close()
+
+    gc.collect()
+    before = tracemalloc.take_snapshot()
+    entries = [
+        _entry(hass, f"butt{index}", butt_server.host, butt_server.port)
+        for index in range(count)
+    ]
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    hubs = [entry["hub"] for entry in hass.data[DOMAIN].values()]
+    await asyncio.gather(*(hub.async_refresh() for hub in hubs))
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    entry_size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    entities = len(hass.states.async_entity_ids())
+
+    assert all(hub.last_update_success for hub in hubs)
+    _report(
+        f"memory of {entities / count:.0f} entities per entry",
+        hub_kb=hub_size / count / 1024,
+        entry_kb=entry_size / count / 1024,
+        per_entity_bytes=(entry_size - hub_size) / entities,
+    )
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_pipelined_command(butt_server: FakeButtServer) -> None:
+    """A command with its status in one write against two round-trips."""
+    butt_server.latency = 0.002
+    connection = ButtConnection(butt_server.host, butt_server.port)
+    await connection.async_request(CMD_GET_STATUS)
+
+    pipelined = []
+    separate = []
+    for _ in range(100):
+        start = time.perf_counter()
+        await connection.async_request_with_status(CMD_SPLIT_RECORD)
+        pipelined.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await connection.async_request(CMD_SPLIT_RECORD)
+        await connection.async_request(CMD_GET_STATUS)
+        separate.append(time.perf_counter() - start)
+
+    _report(
+        "command and status [ms]",
+        pipelined_p50=_percentile(pipelined, 50) * 1000,
+        separate_p50=_percentile(separate, 50) * 1000,
+    )
+    assert butt_server.splits == 200
+    await connection.async_close()
+
+
+async def test_fleet_schedule(hass: HomeAssistant) -> None:
+    """Poll jitter, interval adherence and open sockets of the fleet.
+
+    100 hubs on 20 servers poll every second for 5 seconds, hubs of one
+    server share a connection.
+    """
+    loop = asyncio.get_running_loop()
+    fleet = ButtFleet(hass)
+    servers = [await FakeButtServer().start() for _ in range(20)]
+    for server in servers:
+        server.connected = True
+    jitter = []
+    gaps = []
+    peak_sockets = 0
+
+    def recording_refresh(hub: ButtHub):
+        refresh = hub.async_refresh
+        polls = []
+
+        async def async_refresh() -> None:
+            nonlocal peak_sockets
+            now = loop.time()
+            # The first poll runs right away, the following ones on the grid
+            if polls:
+                jitter.append(now - fleet._due[hub])
+            if len(polls) >= 2:
+                gaps.append(now - polls[-1])
+            polls.append(now)
+            peak_sockets = max(
+                peak_sockets, sum(server.open_connections for server in servers)
+            )
+            await refresh()
+
+        return async_refresh
+
+    hubs = []
+    for index in range(100):
+        server = servers[index % len(servers)]
+        hub = ButtHub(
+            hass,
+            f"butt{index}",
+            server.host,
+            server.port,
+            1,
+            1,
+            connection=fleet.async_get_connection(server.host, server.port),
+        )
+        hub.async_refresh = recording_refresh(hub)
+        hubs.append(hub)
+
+    for hub in hubs:
+        fleet.async_register(hub)
+    await asyncio.sleep(5)
+    for hub in hubs:
+        fleet.async_unregister(hub)
+        await fleet.async_release_connection(hub.host, hub.port)
+
+    requests = sum(len(server.received) for server in servers)
+    for server in servers:
+        await server.stop()
+
+    assert all(hub.last_update_success for hub in hubs)
+    _report(
+        "fleet schedule",
+        jitter_p50_ms=_percentile(jitter, 50) * 1000,
+        jitter_p95_ms=_percentile(jitter, 95) * 1000,
+        interval_p5_s=_percentile(gaps, 5),
+        interval_p95_s=_percentile(gaps, 95),
+        peak_sockets=peak_sockets,
+        requests_per_poll=requests / (len(jitter) + len(hubs)),
+    )
+
+
+async def test_setup_with_dead_servers(hass: HomeAssistant) -> None:
+    """Setup time of 100 entries, half of them on servers that don't answer.
+
+    25 entries point at a closed port, 25 at a server that accepts but
+    never replies. Neither may delay the setup.
+    """
+    reachable = await FakeButtServer().start()
+    silent = await FakeButtServer(latency=60).start()
+    refused = await FakeButtServer().start()
+    await refused.stop()
+    servers = [reachable] * 50 + [silent] * 25 + [refused] * 25
+    entries = [
+        _entry(hass, f"butt{index}", server.host, server.port)
+        for index, server in enumerate(servers)
+    ]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(hass.config_entries.async_setup(entry.entry_id) for entry in entries)
+    )
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+
+    assert all(results)
+    _report(
+        "setup of 100 entries, 50 unreachable",
+        total_ms=elapsed * 1000,
+        per_entry_ms=elapsed / len(entries) * 1000,
+    )
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await reachable.stop()
+    await silent.stop()
+
+
+async def test_fleet_of_1000_entries(hass: HomeAssistant) -> None:
+    """CPU and memory of 1000 entries with all their entities.
+
+    Every entry has its own server. A poll round of an idle fleet writes
+    no states, a round in which every server changed writes some. The
+    setup runs under tracemalloc, compare its CPU time between runs only.
+    """
+    count = 1000
+    # A listener and both ends of a connection per server
+    limits = _raise_open_files(3 * count + 100)
+    servers = [await FakeButtServer().start() for _ in range(count)]
+    for server in servers:
+        server.connected = True
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.process_time()
+    entries = [
+        _entry(hass, f"butt{index}", server.host, server.port)
+        for index, server in enumerate(servers)
+    ]
+    # Sets up all entries, as at boot
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    setup_cpu = time.process_time() - start
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    entities = len(hass.states.async_entity_ids()) / count
+
+    hubs = [entry["hub"] for entry in hass.data[DOMAIN].values()]
+    # First polls in flight while the setup keeps the loop busy may time out
+    setup_timeouts = sum(hub.stats.timeouts for hub in hubs)
+    await asyncio.sleep(max(hub._connection.breaker.retry_in for hub in hubs))
+    await asyncio.gather(*(hub.async_refresh() for hub in hubs))
+
+    async def poll_round() -> float:
+        start = time.process_time()
+        await asyncio.gather(*(hub.async_refresh() for hub in hubs))
+        return time.process_time() - start
+
+    idle = [await poll_round() for _ in range(3)]
+    changing = []
+    for listeners in range(3):
+        for server in servers:
+            server.listeners = listeners + 1
+            server.song = f"Song {listeners}"
+        changing.append(await poll_round())
+
+    assert all(hub.last_update_success for hub in hubs)
+    _report(
+        f"{count} entries with {entities:.0f} entities each",
+        setup_cpu_s=setup_cpu,
+        setup_timeouts=setup_timeouts,
+        setup_memory_mb=size / 1024**2,
+        idle_round_cpu_ms=statistics.median(idle) * 1000,
+        changing_round_cpu_ms=statistics.median(changing) * 1000,
+    )
+    for entry in entries:
+        await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    for server in servers:
+        await server.stop()
+    resource.setrlimit(resource.RLIMIT_NOFILE, limits)
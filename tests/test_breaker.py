@@ -0,0 +1,61 @@
+"""Tests for the circuit breaker."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.butt import breaker as breaker_module
+from custom_components.butt.breaker import BreakerState, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Return a settable monotonic clock."""
+    now = [1000.0]
+    monkeypatch.setattr(breaker_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_on_failure_and_probes_after_cooloff(clock) -> None:
+    """A failure opens the breaker until the cool-off passed."""
+    breaker = CircuitBreaker(cooloff_min=5, cooloff_max=300)
+    assert breaker.allow()
+
+    assert breaker.failure()
+    assert breaker.state is BreakerState.OPEN
+    assert not breaker.allow()
+    assert breaker.retry_in == 5
+
+    clock[0] += 5
+    assert breaker.allow()
+    assert breaker.state is BreakerState.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+
+    assert breaker.success()
+    assert breaker.state is BreakerState.CLOSED
+    assert breaker.cooloff == 0
+
+
+def test_cooloff_doubles_up_to_the_maximum(clock) -> None:
+    """Failed probes double the cool-off."""
+    breaker = CircuitBreaker(cooloff_min=5, cooloff_max=30)
+    cooloffs = []
+    for _ in range(5):
+        breaker.failure()
+        cooloffs.append(breaker.cooloff)
+        clock[0] += breaker.cooloff
+        assert breaker.allow()
+    assert cooloffs == [5, 10, 20, 30, 30]
+
+
+def test_cancelled_probe_allows_a_new_probe(clock) -> None:
+    """A cancelled probe does not block the breaker half open."""
+    breaker = CircuitBreaker(cooloff_min=5)
+    breaker.failure()
+    clock[0] += 5
+    assert breaker.allow()
+
+    breaker.cancel_probe()
+    assert breaker.state is BreakerState.OPEN
+    assert breaker.allow()
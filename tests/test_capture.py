@@ -0,0 +1,89 @@
+"""Tests for the status capture and its replay."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.butt.capture import StatusCapture
+from custom_components.butt.replay import MAGIC, RECORD, iter_capture
+
+PAYLOADS = [b"\x01\x00\x00\x00", b"", b"\x00" * 300, bytes(range(256))]
+
+
+def _read(path: Path) -> list[tuple[float, bytes]]:
+    return [(timestamp, bytes(reply)) for timestamp, reply in iter_capture(str(path))]
+
+
+async def test_capture_round_trip(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Captured replies are read back in order."""
+    path = tmp_path / "studio.cap"
+    capture = StatusCapture(hass, str(path))
+
+    for payload in PAYLOADS[:2]:
+        capture.async_add(payload)
+    await capture.async_flush()
+    for payload in PAYLOADS[2:]:
+        capture.async_add(payload)
+    await capture.async_flush()
+
+    records = _read(path)
+    assert [payload for _, payload in records] == PAYLOADS
+    timestamps = [timestamp for timestamp, _ in records]
+    assert timestamps == sorted(timestamps)
+    assert path.read_bytes().count(MAGIC) == 1
+
+
+async def test_capture_rotates_at_max_size(hass: HomeAssistant, tmp_path: Path) -> None:
+    """A batch that would exceed max_size moves the log to <path>.1."""
+    path = tmp_path / "studio.cap"
+    record_size = RECORD.size + 100
+    capture = StatusCapture(hass, str(path), max_size=len(MAGIC) + 2 * record_size)
+
+    for batch in range(5):
+        capture.async_add(b"\x00" * 99 + bytes([batch]))
+        await capture.async_flush()
+
+    assert path.stat().st_size <= capture.max_size
+    rotated = path.with_name("studio.cap.1")
+    assert rotated.stat().st_size <= capture.max_size
+    # Two batches fit, the third and fifth rotated
+    assert [payload[-1] for _, payload in _read(rotated)] == [2, 3]
+    assert [payload[-1] for _, payload in _read(path)] == [4]
+
+
+async def test_empty_flush_creates_nothing(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Flushing without replies does not touch the disk."""
+    path = tmp_path / "studio.cap"
+    await StatusCapture(hass, str(path)).async_flush()
+
+    assert not path.exists()
+
+
+@pytest.mark.parametrize("cut", [1, RECORD.size - 1, RECORD.size, RECORD.size + 3])
+def test_truncated_last_record_is_skipped(tmp_path: Path, cut: int) -> None:
+    """A record cut off by a crash while writing is left out."""
+    records = [RECORD.pack(float(index), 4) + b"abcd" for index in range(3)]
+    path = tmp_path / "studio.cap"
+    path.write_bytes(MAGIC + b"".join(records[:2]) + records[2][:cut])
+
+    assert _read(path) == [(0.0, b"abcd"), (1.0, b"abcd")]
+
+
+def test_empty_capture(tmp_path: Path) -> None:
+    """A log that was created but never written has no records."""
+    path = tmp_path / "studio.cap"
+    path.touch()
+
+    assert _read(path) == []
+
+
+def test_not_a_capture(tmp_path: Path) -> None:
+    """Other files are rejected."""
+    path = tmp_path / "studio.cap"
+    path.write_bytes(b"GIF89a" + b"\x00" * 20)
+
+    with pytest.raises(ValueError):
+        _read(path)
@@ -0,0 +1,118 @@
+"""Tests for the BUTT config flow."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import pytest
+from homeassistant import config_entries
+from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.butt.const import CONF_NETWORK, DEFAULT_SCAN_INTERVAL, DOMAIN
+
+from .fake_butt import FakeButtServer
+
+
+@pytest.fixture(autouse=True)
+def mock_setup() -> Iterator[None]:
+    """Create the entries without setting them up."""
+    with patch("custom_components.butt.async_setup_entry", return_value=True), patch(
+        "custom_components.butt.config_flow.async_get_source_ip",
+        return_value="192.168.1.20",
+    ):
+        yield
+
+
+async def _scan(hass: HomeAssistant) -> dict:
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    assert result["type"] is FlowResultType.MENU
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": "scan"}
+    )
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "scan"
+    return result
+
+
+async def test_scan_and_pick(hass: HomeAssistant, butt_server: FakeButtServer) -> None:
+    """A found server is picked and set up with the scanned port."""
+    result = await _scan(hass)
+    assert result["data_schema"]({CONF_PORT: 1256})[CONF_NETWORK] == "192.168.1.0/24"
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"],
+        {CONF_NETWORK: butt_server.host, CONF_PORT: butt_server.port},
+    )
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "pick"
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_HOST: butt_server.host, CONF_NAME: "studio"}
+    )
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert result["title"] == "studio"
+    assert result["data"] == {
+        CONF_NAME: "studio",
+        CONF_HOST: butt_server.host,
+        CONF_PORT: butt_server.port,
+        CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL,
+    }
+
+
+async def test_scan_invalid_network(hass: HomeAssistant) -> None:
+    """An invalid subnet is reported on the network field."""
+    result = await _scan(hass)
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_NETWORK: "192.168.1.0/33", CONF_PORT: 1256}
+    )
+
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "scan"
+    assert result["errors"] == {CONF_NETWORK: "invalid_network"}
+
+
+async def test_scan_finds_no_servers(hass: HomeAssistant) -> None:
+    """A scan without answers asks again."""
+    server = await FakeButtServer().start()
+    port = server.port
+    await server.stop()
+    result = await _scan(hass)
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {CONF_NETWORK: "127.0.0.1", CONF_PORT: port}
+    )
+
+    assert result["type"] is FlowResultType.FORM
+    assert result["step_id"] == "scan"
+    assert result["errors"] == {"base": "no_servers"}
+
+
+async def test_scan_skips_configured_servers(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """Servers that are set up already are not offered again."""
+    MockConfigEntry(
+        domain=DOMAIN,
+        unique_id="studio",
+        data={
+            CONF_NAME: "studio",
+            CONF_HOST: butt_server.host,
+            CONF_PORT: butt_server.port,
+            CONF_SCAN_INTERVAL: DEFAULT_SCAN_INTERVAL,
+        },
+    ).add_to_hass(hass)
+    result = await _scan(hass)
+
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"],
+        {CONF_NETWORK: butt_server.host, CONF_PORT: butt_server.port},
+    )
+
+    assert result["errors"] == {"base": "no_servers"}
@@ -0,0 +1,248 @@
+"""Tests for the BUTT connection against the fake server."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.butt.breaker import BreakerState, CircuitOpenError
+from custom_components.butt.connection import ButtConnection
+from custom_components.butt.const import CMD_GET_STATUS, CMD_SPLIT_RECORD
+from custom_components.butt.decoder import decode_status
+
+from .fake_butt import CMD_GET_STATUS as GET_STATUS, CMD_SPLIT_RECORD as SPLIT
+from .fake_butt import FakeButtServer
+
+
+def _connection(server: FakeButtServer, **kwargs) -> ButtConnection:
+    return ButtConnection(server.host, server.port, **kwargs)
+
+
+async def test_extended_status(butt_server: FakeButtServer) -> None:
+    """All fields of an extended packet are decoded."""
+    butt_server.connected = True
+    butt_server.recording = True
+    butt_server.stream_seconds = 3600
+    butt_server.stream_kbytes = 57600
+    butt_server.song = "Artist – Title"
+    butt_server.record_path = "/srv/rec/show.mp3"
+    butt_server.listeners = 42
+    connection = _connection(butt_server)
+
+    status = decode_status(await connection.async_request(CMD_GET_STATUS))
+
+    assert status.connected and status.recording and status.extendedpacket
+    assert not status.connecting
+    assert status.packetversion == 3
+    assert status.volumeleft == -12.5
+    assert status.volumeright == -11.0
+    assert status.streamseconds == 3600
+    assert status.streamkbytes == 57600
+    assert status.song == "Artist – Title"
+    assert status.recordpath == "/srv/rec/show.mp3"
+    assert status.listeners == 42
+    await connection.async_close()
+
+
+async def test_basic_status() -> None:
+    """Servers without extended packets send the status word only."""
+    async with FakeButtServer(extended=False) as server:
+        server.connected = True
+        connection = _connection(server)
+
+        status = decode_status(await connection.async_request(CMD_GET_STATUS))
+
+        assert status.connected
+        assert not status.extendedpacket
+        assert status.song is None
+        await connection.async_close()
+
+
+async def test_fragmented_reply_with_long_strings() -> None:
+    """Replies split into small chunks are read up to their announced length."""
+    async with FakeButtServer(fragment=7, fragment_delay=0.001) as server:
+        server.song = "S" * 2000
+        server.record_path = "/p" * 1000
+        connection = _connection(server)
+
+        for _ in range(3):
+            status = decode_status(await connection.async_request(CMD_GET_STATUS))
+            assert status.song == server.song
+            assert status.recordpath == server.record_path
+
+        assert server.connections == 1
+        await connection.async_close()
+
+
+async def test_oversized_reply(butt_server: FakeButtServer) -> None:
+    """A packet announcing more than the reply limit is rejected."""
+    butt_server.song = "S" * 10000
+    connection = _connection(butt_server, max_reply_size=8192)
+
+    with pytest.raises(ValueError):
+        await connection.async_request(CMD_GET_STATUS)
+    # The server answered, it is reachable
+    assert connection.breaker.state is BreakerState.CLOSED
+    await connection.async_close()
+
+
+async def test_keep_alive(butt_server: FakeButtServer) -> None:
+    """Requests share one connection."""
+    connection = _connection(butt_server)
+    for _ in range(5):
+        await connection.async_request(CMD_GET_STATUS)
+
+    assert butt_server.connections == 1
+    assert connection.stats.requests == 5
+    assert connection.stats.connects == 1
+    await connection.async_close()
+
+
+async def test_one_connection_per_request() -> None:
+    """Servers that close after each reply get a connection per request."""
+    async with FakeButtServer(one_opcode_per_connection=True) as server:
+        connection = _connection(server)
+        for _ in range(3):
+            assert decode_status(await connection.async_request(CMD_GET_STATUS))
+
+        assert server.connections == 3
+        assert connection.breaker.state is BreakerState.CLOSED
+        await connection.async_close()
+
+
+async def test_dropped_idle_connection_is_retried(butt_server: FakeButtServer) -> None:
+    """A status request on a dropped kept-alive socket is retried once."""
+    connection = _connection(butt_server)
+    await connection.async_request(CMD_GET_STATUS)
+
+    butt_server.drop_status = 1
+    assert decode_status(await connection.async_request(CMD_GET_STATUS))
+
+    assert butt_server.received.count(GET_STATUS) == 3
+    assert connection.breaker.state is BreakerState.CLOSED
+    await connection.async_close()
+
+
+async def test_keep_alive_resumes_after_a_drop(butt_server: FakeButtServer) -> None:
+    """A dropped idle socket does not switch to one connection per request."""
+    connection = _connection(butt_server)
+    await connection.async_request(CMD_GET_STATUS)
+
+    butt_server.drop_status = 1
+    for _ in range(6):
+        await connection.async_request(CMD_GET_STATUS)
+
+    assert butt_server.connections == 2
+    assert connection.connected
+    await connection.async_close()
+
+
+async def test_concurrent_status_requests_coalesce(butt_server: FakeButtServer) -> None:
+    """Status requests in flight at the same time share one round-trip."""
+    butt_server.latency = 0.05
+    connection = _connection(butt_server)
+
+    replies = await asyncio.gather(
+        *(connection.async_request(CMD_GET_STATUS) for _ in range(5))
+    )
+
+    assert len(set(replies)) == 1
+    assert butt_server.received == [GET_STATUS]
+    await connection.async_close()
+
+
+async def test_close_cancels_status_request() -> None:
+    """Closing does not wait for the reply of a status request in flight."""
+    async with FakeButtServer(latency=10) as server:
+        connection = _connection(server)
+        request = asyncio.ensure_future(connection.async_request(CMD_GET_STATUS))
+        await asyncio.sleep(0.05)
+
+        await asyncio.wait_for(connection.async_close(), 0.5)
+
+        with pytest.raises(asyncio.CancelledError):
+            await request
+        assert not connection.connected
+        assert connection.breaker.state is BreakerState.CLOSED
+
+
+async def test_timeout() -> None:
+    """A server that does not answer in time counts as a failure."""
+    async with FakeButtServer(latency=1) as server:
+        connection = _connection(server, timeout=0.1)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await connection.async_request(CMD_GET_STATUS)
+        assert connection.breaker.state is BreakerState.OPEN
+        await connection.async_close()
+
+
+async def test_breaker_skips_unreachable_server() -> None:
+    """After a failed connect, requests fail without touching the network."""
+    server = await FakeButtServer().start()
+    host, port = server.host, server.port
+    await server.stop()
+    connection = ButtConnection(host, port, timeout=0.5)
+
+    with pytest.raises(OSError):
+        await connection.async_request(CMD_GET_STATUS)
+    assert connection.breaker.state is BreakerState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await connection.async_request(CMD_GET_STATUS)
+    assert connection.stats.connects == 0
+
+
+async def test_pipelined_command(butt_server: FakeButtServer) -> None:
+    """A command and the status after it take one connection and one write."""
+    connection = _connection(butt_server)
+
+    latency, reply = await connection.async_request_with_status(CMD_SPLIT_RECORD)
+
+    assert latency >= 0
+    assert decode_status(reply)
+    assert butt_server.received == [SPLIT, GET_STATUS]
+    assert butt_server.splits == 1
+    assert butt_server.connections == 1
+    await connection.async_close()
+
+
+async def test_pipelined_status_reflects_the_command(butt_server: FakeButtServer) -> None:
+    """The status read after a command shows its effect."""
+    connection = _connection(butt_server)
+
+    _, reply = await connection.async_request_with_status(b"\x03")
+
+    assert decode_status(reply).recording
+    await connection.async_close()
+
+
+async def test_pipelined_command_is_not_resent(butt_server: FakeButtServer) -> None:
+    """A drop after the command ran does not send the command again."""
+    connection = _connection(butt_server)
+    await connection.async_request(CMD_GET_STATUS)
+
+    butt_server.drop_after_command = 1
+    _, reply = await connection.async_request_with_status(CMD_SPLIT_RECORD)
+
+    assert butt_server.splits == 1
+    # The status was read separately
+    assert decode_status(reply)
+    assert connection.breaker.state is BreakerState.CLOSED
+    await connection.async_close()
+
+
+async def test_pipelining_off_for_one_opcode_per_connection() -> None:
+    """Servers that take one opcode per connection get commands on their own."""
+    async with FakeButtServer(one_opcode_per_connection=True) as server:
+        connection = _connection(server)
+
+        for _ in range(3):
+            _, reply = await connection.async_request_with_status(CMD_SPLIT_RECORD)
+            assert decode_status(reply)
+
+        assert server.splits == 3
+        assert server.received.count(GET_STATUS) == 3
+        assert connection.breaker.state is BreakerState.CLOSED
+        await connection.async_close()
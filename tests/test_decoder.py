@@ -0,0 +1,127 @@
+"""Tests for the status packet decoder."""
+
+from __future__ import annotations
+
+import random
+import struct
+
+import pytest
+
+from custom_components.butt.decoder import ButtStatus, decode_status
+
+EXTENDED = 1 << 31
+ALPHABET = "abcXYZ019 -_/.äöüß–♪日本\x00"
+
+
+def _reference(data: bytes) -> dict:
+    """Parse a packet field by field like the original read_data."""
+    (status,) = struct.unpack("<I", data[:4])
+    fields = {
+        "connected": bool(status & 1 << 0),
+        "connecting": bool(status & 1 << 1),
+        "recording": bool(status & 1 << 2),
+        "signaldetected": bool(status & 1 << 3),
+        "silencedetected": bool(status & 1 << 4),
+        "extendedpacket": bool(status & EXTENDED),
+    }
+    if not fields["extendedpacket"]:
+        return fields
+
+    (
+        fields["packetversion"],
+        volume_left,
+        volume_right,
+        fields["streamseconds"],
+        fields["streamkbytes"],
+        fields["recordseconds"],
+        fields["recordkbytes"],
+        song_length,
+        rec_path_length,
+        fields["listeners"],
+    ) = struct.unpack("<HhhIIIIHHi", data[4:34])
+    fields["volumeleft"] = volume_left * 0.1
+    fields["volumeright"] = volume_right * 0.1
+    song_end = 34 + song_length
+    fields["song"] = data[34:song_end].rstrip(b"\x00").decode()
+    fields["recordpath"] = (
+        data[song_end : song_end + rec_path_length].rstrip(b"\x00").decode()
+    )
+    return fields
+
+
+def _random_packet(rng: random.Random) -> bytes:
+    status = rng.getrandbits(32)
+    if not status & EXTENDED:
+        return struct.pack("<I", status)
+
+    song = "".join(rng.choices(ALPHABET, k=rng.randrange(300))).encode()
+    rec_path = "".join(rng.choices(ALPHABET, k=rng.randrange(300))).encode()
+    return (
+        struct.pack(
+            "<IHhhIIIIHHi",
+            status,
+            rng.randrange(1, 4),
+            rng.randrange(-32768, 32768),
+            rng.randrange(-32768, 32768),
+            rng.getrandbits(32),
+            rng.getrandbits(32),
+            rng.getrandbits(32),
+            rng.getrandbits(32),
+            len(song),
+            len(rec_path),
+            rng.randrange(-(2**31), 2**31),
+        )
+        + song
+        + rec_path
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_packets_match_the_reference(seed: int) -> None:
+    """Random packets decode like the field by field parse."""
+    rng = random.Random(seed)
+    for _ in range(2000):
+        packet = _random_packet(rng)
+
+        status = decode_status(packet)
+
+        assert {
+            key: value for key, value in status._asdict().items() if value is not None
+        } == _reference(packet), packet
+
+
+def test_empty_reply() -> None:
+    """An empty reply is no status."""
+    assert decode_status(b"") is None
+
+
+def test_newer_packet_version() -> None:
+    """Newer packets are decoded by their version 3 prefix."""
+    packet = (
+        struct.pack("<IHhhIIIIHHi", EXTENDED | 1, 4, -100, -50, 1, 2, 3, 4, 4, 2, 7)
+        + b"song/p"
+        # Fields a later version appends
+        + b"\x01\x02\x03\x04"
+    )
+
+    status = decode_status(packet)
+
+    assert status == ButtStatus(
+        True, False, False, False, False, True, 4, -10.0, -5.0, 1, 2, 3, 4, "song", "/p", 7
+    )
+
+
+@pytest.mark.parametrize(
+    "packet",
+    [
+        b"\x01\x00",
+        struct.pack("<I", EXTENDED),
+        struct.pack("<IHhh", EXTENDED, 3, 0, 0),
+        struct.pack("<IHhhIIIIHHi", EXTENDED, 3, 0, 0, 0, 0, 0, 0, 10, 10, 0) + b"short",
+    ],
+    ids=["status", "header", "partial header", "strings"],
+)
+def test_truncated_packets(packet: bytes) -> None:
+    """Packets shorter than announced are rejected."""
+    with pytest.raises(ValueError):
+        decode_status(packet)
@@ -0,0 +1,99 @@
+"""Tests for the BUTT server discovery."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+import pytest_socket
+
+from custom_components.butt.discovery import async_discover, discovery_hosts
+
+from .fake_butt import FakeButtServer
+
+HOSTS = [f"127.0.0.{index}" for index in range(2, 7)]
+
+
+@pytest.fixture(autouse=True)
+def allow_lan_hosts() -> None:
+    """Let the probes reach the loopback addresses standing in for a LAN."""
+    pytest_socket.socket_allow_hosts(["127.0.0.1", *HOSTS])
+
+
+async def _reply_http(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    await reader.read(1)
+    writer.write(b"HTTP/1.0 400 Bad Request\r\n\r\n")
+    await writer.drain()
+    writer.close()
+
+
+async def _stay_silent(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    await reader.read()
+    writer.close()
+
+
+@pytest.fixture
+async def lan() -> AsyncIterator[tuple[int, list[FakeButtServer]]]:
+    """BUTT servers, another service and a silent listener on one port.
+
+    Each host is a loopback address, 127.0.0.4 listens on nothing.
+    """
+    first = await FakeButtServer(host="127.0.0.2").start()
+    port = first.port
+    second = await FakeButtServer(host="127.0.0.3").start(port)
+    second.connected = True
+    http = await asyncio.start_server(_reply_http, "127.0.0.5", port)
+    silent = await asyncio.start_server(_stay_silent, "127.0.0.6", port)
+
+    yield port, [first, second]
+
+    for server in (http, silent):
+        server.close()
+        await server.wait_closed()
+    await first.stop()
+    await second.stop()
+
+
+async def test_discover_finds_only_butt_servers(
+    lan: tuple[int, list[FakeButtServer]]
+) -> None:
+    """Closed ports, other services and silent listeners are left out."""
+    port, servers = lan
+
+    found = await async_discover(HOSTS, port, timeout=0.2)
+
+    assert set(found) == {"127.0.0.2", "127.0.0.3"}
+    assert not found["127.0.0.2"].connected
+    assert found["127.0.0.3"].connected
+    assert found["127.0.0.3"].packetversion == 3
+    assert all(server.open_connections == 0 for server in servers)
+
+
+async def test_discover_limits_concurrency(
+    lan: tuple[int, list[FakeButtServer]]
+) -> None:
+    """A small concurrency still probes every host."""
+    port, _ = lan
+
+    found = await async_discover(HOSTS, port, concurrency=1, timeout=0.2)
+
+    assert set(found) == {"127.0.0.2", "127.0.0.3"}
+
+
+def test_discovery_hosts() -> None:
+    """Subnets give their hosts, lists their entries."""
+    assert discovery_hosts("192.168.1.0/30") == ["192.168.1.1", "192.168.1.2"]
+    assert discovery_hosts("192.168.1.7/30") == ["192.168.1.5", "192.168.1.6"]
+    assert discovery_hosts(" 10.0.0.1, ,studio.local ") == ["10.0.0.1", "studio.local"]
+
+
+@pytest.mark.parametrize("network", ["192.168.1.0/33", "10.0.0.0/8", "nonsense/24"])
+def test_invalid_networks(network: str) -> None:
+    """Invalid and too large subnets are rejected."""
+    with pytest.raises(ValueError):
+        discovery_hosts(network)
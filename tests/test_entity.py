@@ -0,0 +1,55 @@
+"""Tests for the entity updates."""
+
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from custom_components.butt.const import DOMAIN
+from custom_components.butt.entity import ButtEntity
+from custom_components.butt.hub import ButtHub
+
+from .fake_butt import FakeButtServer
+
+
+async def test_idle_polls_write_no_states(
+    hass: HomeAssistant, butt_server: FakeButtServer, butt_entry: ConfigEntry, monkeypatch
+) -> None:
+    """Polls of an unchanged server write no entity states."""
+    hub: ButtHub = hass.data[DOMAIN]["studio"]["hub"]
+    writes = []
+    write = ButtEntity.async_write_ha_state
+
+    def counting_write(entity: ButtEntity) -> None:
+        writes.append(entity.entity_id)
+        write(entity)
+
+    monkeypatch.setattr(ButtEntity, "async_write_ha_state", counting_write)
+    butt_server.connected = True
+    butt_server.song = "Artist – Title"
+    await hub.async_refresh()
+    assert writes
+
+    writes.clear()
+    for _ in range(5):
+        await hub.async_refresh()
+    assert writes == []
+
+    butt_server.listeners = 3
+    await hub.async_refresh()
+    assert writes == ["sensor.studio_listeners"]
+
+
+async def test_vu_attributes_are_not_recorded(
+    hass: HomeAssistant, butt_entry: ConfigEntry
+) -> None:
+    """The recorder leaves out the VU window summaries of the volumes."""
+    state = hass.states.get("sensor.studio_volume_left")
+
+    assert state.state_info["unrecorded_attributes"] >= {
+        "min",
+        "max",
+        "mean",
+        "rms",
+        "samples",
+    }
@@ -0,0 +1,49 @@
+"""Tests for the status bit debouncing."""
+
+from __future__ import annotations
+
+from custom_components.butt.events import BitDebouncer
+
+
+def test_first_value_is_no_transition() -> None:
+    """The first sample only sets the state."""
+    debouncer = BitDebouncer(5)
+
+    assert debouncer.update(False, 0) is None
+    assert debouncer.state is False
+
+
+def test_transition_after_debounce() -> None:
+    """A new value is accepted once it held for the debounce time."""
+    debouncer = BitDebouncer(5)
+    debouncer.update(False, 0)
+
+    assert debouncer.update(True, 100) is None
+    assert debouncer.update(True, 103) is None
+    # The old value lasted until the new one was first seen
+    assert debouncer.update(True, 105) == (False, True, 100)
+    assert debouncer.since == 100
+
+    assert debouncer.update(False, 160) is None
+    assert debouncer.update(False, 170) == (True, False, 60)
+
+
+def test_flapping_bit_fires_nothing() -> None:
+    """A value that flips back within the debounce time is ignored."""
+    debouncer = BitDebouncer(5)
+    debouncer.update(False, 0)
+
+    for second in range(10, 40, 2):
+        assert debouncer.update(second % 4 == 0, second) is None
+
+    assert debouncer.state is False
+    assert debouncer.since == 0
+
+
+def test_without_debounce() -> None:
+    """Without a debounce time every change is a transition."""
+    debouncer = BitDebouncer(0)
+    debouncer.update(False, 0)
+
+    assert debouncer.update(True, 1) == (False, True, 1)
+    assert debouncer.update(False, 1.5) == (True, False, 0.5)
@@ -0,0 +1,149 @@
+"""Tests for the shared poll scheduler."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.butt.const import CMD_GET_STATUS
+from custom_components.butt.fleet import ButtFleet
+
+from .fake_butt import CMD_GET_STATUS as GET_STATUS
+from .fake_butt import FakeButtServer
+
+
+class FakeHub:
+    """Stand-in for ButtHub with the attributes the fleet uses."""
+
+    def __init__(self, fleet: ButtFleet, name: str, host: str, port: int, interval: float):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.poll_interval = interval
+        self.fleet = None
+        self.connection = fleet.async_get_connection(host, port)
+        self.polls: list[float] = []
+        self.refresh_time = 0.0
+
+    async def async_refresh(self) -> None:
+        self.polls.append(asyncio.get_running_loop().time())
+        if self.refresh_time:
+            await asyncio.sleep(self.refresh_time)
+        else:
+            await self.connection.async_request(CMD_GET_STATUS)
+
+
+async def test_first_poll_is_immediate(hass: HomeAssistant, butt_server: FakeButtServer) -> None:
+    """A registered hub is polled right away."""
+    fleet = ButtFleet(hass)
+    hub = FakeHub(fleet, "a", butt_server.host, butt_server.port, 10)
+
+    fleet.async_register(hub)
+    await asyncio.sleep(0.05)
+
+    assert len(hub.polls) == 1
+    assert hub.fleet is fleet
+    fleet.async_unregister(hub)
+    await fleet.async_release_connection(hub.host, hub.port)
+
+
+async def test_hubs_of_one_server_share_the_grid(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """Hubs of one server registered apart poll together and coalesce."""
+    fleet = ButtFleet(hass)
+    butt_server.latency = 0.02
+    first = FakeHub(fleet, "a", butt_server.host, butt_server.port, 0.2)
+    second = FakeHub(fleet, "b", butt_server.host, butt_server.port, 0.2)
+
+    loop = asyncio.get_running_loop()
+
+    fleet.async_register(first)
+    # Register the second hub halfway between two slots
+    slot = fleet._next_slot(first, loop.time())
+    await asyncio.sleep(slot + 0.1 - loop.time())
+    fleet.async_register(second)
+    await asyncio.sleep(slot + 0.5 - loop.time())
+    fleet.async_unregister(first)
+    fleet.async_unregister(second)
+
+    # After their own first polls both poll at the same slots
+    assert [when for when in first.polls if when > slot + 0.1] == pytest.approx(
+        second.polls[1:], abs=0.01
+    )
+    assert len(second.polls) == 3
+    # One status request per slot for both hubs
+    assert butt_server.received.count(GET_STATUS) == len(first.polls) + 1
+    await fleet.async_release_connection(butt_server.host, butt_server.port)
+    await fleet.async_release_connection(butt_server.host, butt_server.port)
+
+
+async def test_servers_are_staggered(hass: HomeAssistant) -> None:
+    """Hubs of different servers get different phases."""
+    fleet = ButtFleet(hass)
+    hubs = [FakeHub(fleet, str(port), "127.0.0.1", port, 10) for port in range(3)]
+
+    slots = {fleet._next_slot(hub, 0) % 10 for hub in hubs}
+
+    assert len(slots) == 3
+
+
+async def test_unregister_cancels_the_poll_in_flight(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """A poll in flight is cancelled when the hub is unregistered."""
+    fleet = ButtFleet(hass)
+    hub = FakeHub(fleet, "a", butt_server.host, butt_server.port, 10)
+    hub.refresh_time = 10
+
+    fleet.async_register(hub)
+    await asyncio.sleep(0.05)
+    task = fleet._polling[hub]
+    fleet.async_unregister(hub)
+    await asyncio.sleep(0)
+
+    assert task.cancelled()
+    assert hub.fleet is None
+    await fleet.async_release_connection(hub.host, hub.port)
+
+
+async def test_concurrent_polls_are_bounded(hass: HomeAssistant) -> None:
+    """No more polls than the limit run at once."""
+    fleet = ButtFleet(hass, max_concurrent_polls=2)
+    running = 0
+    peak = 0
+
+    class SlowHub(FakeHub):
+        async def async_refresh(self) -> None:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+    hubs = [SlowHub(fleet, str(port), "127.0.0.1", port, 10) for port in range(6)]
+    for hub in hubs:
+        fleet.async_register(hub)
+    await asyncio.sleep(0.2)
+    for hub in hubs:
+        fleet.async_unregister(hub)
+
+    assert peak == 2
+
+
+async def test_release_closes_the_last_reference(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """The connection is closed when its last hub releases it."""
+    fleet = ButtFleet(hass)
+    first = fleet.async_get_connection(butt_server.host, butt_server.port)
+    second = fleet.async_get_connection(butt_server.host, butt_server.port)
+    assert first is second
+    await first.async_request(CMD_GET_STATUS)
+
+    await fleet.async_release_connection(butt_server.host, butt_server.port)
+    assert first.connected
+    await fleet.async_release_connection(butt_server.host, butt_server.port)
+    assert not first.connected
@@ -0,0 +1,111 @@
+"""Tests for the hub."""
+
+from __future__ import annotations
+
+import asyncio
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.butt.connection import ButtConnection
+from custom_components.butt.const import DEFAULT_MAX_REPLY_SIZE
+from custom_components.butt.decoder import ButtStatus
+from custom_components.butt.hub import ButtHub
+
+from .fake_butt import CMD_START_RECORD, FakeButtServer
+
+
+def _hub(hass: HomeAssistant, server: FakeButtServer) -> ButtHub:
+    return ButtHub(
+        hass,
+        "studio",
+        server.host,
+        server.port,
+        15,
+        connection=ButtConnection(server.host, server.port),
+    )
+
+
+async def test_polled_status_skips_redundant_command(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """A command the polled status already shows is not sent."""
+    butt_server.recording = True
+    hub = _hub(hass, butt_server)
+    await hub.async_refresh()
+
+    await hub.start_record()
+
+    assert CMD_START_RECORD not in butt_server.received
+    await hub.async_shutdown()
+    await hub._connection.async_close()
+
+
+async def test_restored_status_does_not_skip_commands(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """A stale cached status does not swallow a command."""
+    hub = _hub(hass, butt_server)
+    hub.data = ButtStatus(False, False, True, False, False, False)
+
+    await hub.start_record()
+    await hass.async_block_till_done()
+
+    assert butt_server.received[0] == CMD_START_RECORD
+    assert butt_server.recording
+    await hub.async_shutdown()
+    await hub._connection.async_close()
+
+
+async def test_failing_server_does_not_skip_commands(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """The status kept while polls fail does not swallow a command."""
+    butt_server.recording = True
+    hub = _hub(hass, butt_server)
+    await hub.async_refresh()
+    butt_server.recording = False
+    # Replies are rejected, the server stays reachable
+    hub._connection.max_reply_size = 10
+    await hub.async_refresh()
+    assert not hub.last_update_success
+    hub._connection.max_reply_size = DEFAULT_MAX_REPLY_SIZE
+
+    await hub.start_record()
+    await hass.async_block_till_done()
+
+    assert butt_server.received.count(CMD_START_RECORD) == 1
+
+
+async def test_vu_summaries_keep_availability(
+    hass: HomeAssistant, butt_server: FakeButtServer
+) -> None:
+    """Window summaries don't republish the availability of the last poll."""
+    hub = ButtHub(
+        hass,
+        "studio",
+        butt_server.host,
+        butt_server.port,
+        15,
+        connection=ButtConnection(butt_server.host, butt_server.port),
+        vu_sample_interval=0.01,
+        vu_window=0.05,
+    )
+    # As after a poll that made the entities available again
+    hub.availability_changed = True
+    published = []
+    unsubscribe = hub.async_add_listener(
+        lambda: published.append((hub.changed, hub.availability_changed))
+    )
+
+    hub.async_start_vu_sampler()
+    await asyncio.sleep(0.2)
+    hub.async_stop_vu_sampler()
+
+    assert published
+    assert all(
+        changed <= {"volumeleft", "volumeright"} and not availability_changed
+        for changed, availability_changed in published
+    )
+    unsubscribe()
+    await hub.async_shutdown()
+    await hub._connection.async_close()
@@ -0,0 +1,93 @@
+"""Tests for applying options to a running entry."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
+from homeassistant.core import HomeAssistant
+
+from custom_components.butt.const import DATA_FLEET, DOMAIN
+from custom_components.butt.fleet import ButtFleet
+from custom_components.butt.hub import ButtHub
+
+from .fake_butt import FakeButtServer
+
+
+async def _apply_options(
+    hass: HomeAssistant, entry: ConfigEntry, options: dict
+) -> float:
+    """Save new options like the options flow, return the ms until they apply."""
+    start = time.perf_counter()
+    hass.config_entries.async_update_entry(entry, options=options)
+    await hass.async_block_till_done()
+    return (time.perf_counter() - start) * 1000
+
+
+def _entity(hass: HomeAssistant, entity_id: str):
+    return hass.data["entity_components"]["sensor"].get_entity(entity_id)
+
+
+async def test_options_apply_without_reload(
+    hass: HomeAssistant, butt_server: FakeButtServer, butt_entry: ConfigEntry
+) -> None:
+    """Interval, host and port changes keep the hub and its entities."""
+    hub: ButtHub = hass.data[DOMAIN]["studio"]["hub"]
+    fleet: ButtFleet = hass.data[DATA_FLEET]
+    listeners = _entity(hass, "sensor.studio_listeners")
+    connection = hub._connection
+
+    milliseconds = await _apply_options(
+        hass,
+        butt_entry,
+        {
+            CONF_HOST: butt_server.host,
+            CONF_PORT: butt_server.port,
+            CONF_SCAN_INTERVAL: 30,
+        },
+    )
+    print(f"\napplied scan interval in {milliseconds:.1f} ms")
+
+    assert hass.data[DOMAIN]["studio"]["hub"] is hub
+    assert hub.scan_interval == 30
+    assert hub._connection is connection
+    assert _entity(hass, "sensor.studio_listeners") is listeners
+
+    # Hold a poll of the old server in flight
+    butt_server.latency = 10
+    fleet.async_unregister(hub)
+    fleet.async_register(hub)
+    await asyncio.sleep(0.05)
+    poll = fleet._polling[hub]
+
+    async with FakeButtServer() as new_server:
+        new_server.listeners = 42
+
+        milliseconds = await _apply_options(
+            hass,
+            butt_entry,
+            {
+                CONF_HOST: new_server.host,
+                CONF_PORT: new_server.port,
+                CONF_SCAN_INTERVAL: 30,
+            },
+        )
+        print(f"applied host and port in {milliseconds:.1f} ms")
+        # Without waiting for the poll of the old server to time out
+        assert milliseconds < 1000
+
+        assert poll.cancelled()
+        assert not connection.connected
+        assert hass.data[DOMAIN]["studio"]["hub"] is hub
+        assert _entity(hass, "sensor.studio_listeners") is listeners
+
+        # The hub polls the new server right away
+        await asyncio.sleep(0.1)
+        assert new_server.connections == 1
+        assert hass.states.get("sensor.studio_listeners").state == "42"
+        assert hub.port == new_server.port
+
+        assert await hass.config_entries.async_unload(butt_entry.entry_id)
+        await hass.async_block_till_done()
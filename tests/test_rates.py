@@ -0,0 +1,67 @@
+"""Tests for the counter rates."""
+
+from __future__ import annotations
+
+from custom_components.butt.rates import RateTracker
+
+
+def test_rates_of_a_steady_counter() -> None:
+    """A counter growing at a fixed rate gives that rate."""
+    tracker = RateTracker(size=5, span=5)
+    for second in range(0, 60, 10):
+        tracker.add(second, second * 128)
+
+    assert tracker.current == 128
+    assert tracker.average == 128
+
+
+def test_current_rate_spans_at_least_span_seconds() -> None:
+    """Samples closer than span seconds don't turn the resolution into spikes."""
+    tracker = RateTracker(size=10, span=5)
+    tracker.add(0, 0)
+    tracker.add(10, 1280)
+    assert tracker.current == 128
+
+    # A refresh right after a poll, one kByte in 0.1 s would read 80 kbit/s
+    tracker.add(10.1, 1288)
+    assert tracker.current == round(1288 / 10.1, 1)
+
+    tracker.add(15, 1920)
+    assert tracker.current == 128
+
+
+def test_no_current_rate_before_span() -> None:
+    """The current rate waits for samples span seconds apart."""
+    tracker = RateTracker(size=10, span=5)
+    tracker.add(0, 0)
+    tracker.add(1, 128)
+
+    assert tracker.current is None
+    assert tracker.average == 128
+
+
+def test_counter_reset_restarts_without_spike() -> None:
+    """A counter going backwards restarts the rates instead of spiking."""
+    tracker = RateTracker(size=10, span=5)
+    for second in range(0, 50, 10):
+        tracker.add(second, 100000 + second * 128)
+
+    assert tracker.add(50, 64)
+    assert tracker.current is None
+    assert tracker.average is None
+
+    tracker.add(60, 64 + 1280)
+    assert tracker.current == 128
+    assert tracker.average == 128
+
+
+def test_average_over_the_ring() -> None:
+    """The average only covers the samples in the ring."""
+    tracker = RateTracker(size=3, span=5)
+    tracker.add(0, 0)
+    tracker.add(10, 10000)
+    for second in (20, 30, 40):
+        tracker.add(second, 10000 + (second - 10) * 100)
+
+    assert tracker.average == 100
+    assert tracker.current == 100
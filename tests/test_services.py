@@ -0,0 +1,61 @@
+"""Tests for the BUTT services."""
+
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from custom_components.butt.const import DOMAIN, SERVICE_SCHEDULE_COMMAND
+
+from .fake_butt import CMD_SPLIT_RECORD, FakeButtServer
+
+# Allowed delay of a scheduled command behind its target time
+MAX_SKEW = 0.05
+
+
+async def test_schedule_command_skew(
+    hass: HomeAssistant, butt_server: FakeButtServer, butt_entry: ConfigEntry
+) -> None:
+    """A scheduled command reaches the server at the target time."""
+    at = dt_util.utcnow() + timedelta(seconds=0.5)
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SCHEDULE_COMMAND,
+        {"command": "split_record", "at": at, "targets": ["studio"]},
+        blocking=True,
+    )
+    assert butt_server.splits == 0
+    await asyncio.sleep(0.7)
+
+    assert butt_server.splits == 1
+    arrival = butt_server.received_at[butt_server.received.index(CMD_SPLIT_RECORD)]
+    skew = arrival - at.timestamp()
+    print(f"\nscheduled command skew: {skew * 1000:.1f} ms")
+    assert 0 <= skew < MAX_SKEW
+
+
+async def test_unload_cancels_scheduled_command(
+    hass: HomeAssistant, butt_server: FakeButtServer, butt_entry: ConfigEntry
+) -> None:
+    """A command scheduled for an unloaded entry is not sent."""
+    at = dt_util.utcnow() + timedelta(seconds=0.3)
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SCHEDULE_COMMAND,
+        {"command": "split_record", "at": at, "targets": ["studio"]},
+        blocking=True,
+    )
+
+    assert await hass.config_entries.async_unload(butt_entry.entry_id)
+    await hass.async_block_till_done()
+    connections = butt_server.connections
+    await asyncio.sleep(0.5)
+
+    assert butt_server.splits == 0
+    assert butt_server.connections == connections
+    assert butt_server.open_connections == 0
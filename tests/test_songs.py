@@ -0,0 +1,86 @@
+"""Tests for the song history."""
+
+from __future__ import annotations
+
+import homeassistant.util.dt as dt_util
+
+from custom_components.butt.songs import SongHistory
+
+
+def _titles(songs: list[dict]) -> list[str]:
+    return [song["title"] for song in songs]
+
+
+def test_first_title_is_no_change() -> None:
+    """The first title only sets the current song."""
+    history = SongHistory(3)
+
+    assert history.update("A", 0) is None
+    assert _titles(history.recent()) == ["A"]
+
+
+def test_changes_with_durations() -> None:
+    """A new title ends the current song."""
+    history = SongHistory(3)
+    history.update("A", 0)
+
+    assert history.update("B", 180) == ("A", "B", 180)
+    assert history.update("", 400) == ("B", None, 220)
+    assert history.update("C", 410) == (None, "C", 10)
+
+    songs = history.recent()
+    assert _titles(songs) == ["C", "B", "A"]
+    assert songs[0]["duration"] is None
+    assert songs[1] == {
+        "title": "B",
+        "start": dt_util.utc_from_timestamp(180).isoformat(),
+        "duration": 220,
+    }
+
+
+def test_repeated_polls_are_deduplicated() -> None:
+    """Polling the same song does not grow the history."""
+    history = SongHistory(3)
+    history.update("A", 0)
+    for second in range(10, 100, 10):
+        assert history.update("A", second) is None
+    history.update("B", 100)
+    for second in range(110, 200, 10):
+        assert history.update("B", second) is None
+
+    assert _titles(history.recent()) == ["B", "A"]
+    assert history.recent()[1]["duration"] == 100
+
+
+def test_ring_is_bounded() -> None:
+    """Only the latest songs are kept."""
+    history = SongHistory(3)
+    for index in range(100):
+        history.update(f"Song {index}", index * 60)
+
+    assert _titles(history.recent()) == ["Song 99", "Song 98", "Song 97", "Song 96"]
+
+
+def test_recent_count() -> None:
+    """recent(count) returns the latest count songs, the current one first."""
+    history = SongHistory(5)
+    for index in range(4):
+        history.update(f"Song {index}", index * 60)
+
+    assert _titles(history.recent(1)) == ["Song 3"]
+    assert _titles(history.recent(3)) == ["Song 3", "Song 2", "Song 1"]
+    assert _titles(history.recent(10)) == ["Song 3", "Song 2", "Song 1", "Song 0"]
+    assert history.recent(0) == []
+
+    # Without a current song the count is filled from the history
+    history.update(None, 300)
+    assert _titles(history.recent(2)) == ["Song 3", "Song 2"]
+
+
+def test_no_songs() -> None:
+    """Servers without titles have an empty history."""
+    history = SongHistory(3)
+    history.update(None, 0)
+    history.update("", 10)
+
+    assert history.recent() == []
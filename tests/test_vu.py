@@ -0,0 +1,54 @@
+"""Tests for the VU meter aggregation."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.butt.vu import VuSummary, VuWindow
+
+
+def test_empty_window() -> None:
+    """A window without samples has no summary."""
+    assert VuWindow().summary() is None
+
+
+def test_constant_level() -> None:
+    """The RMS level of a constant level is that level."""
+    window = VuWindow()
+    window.add(-12.5)
+    window.add(-12.5)
+
+    assert window.summary() == VuSummary(-12.5, -12.5, -12.5, pytest.approx(-12.5), 2)
+
+
+def test_rms_over_linear_power() -> None:
+    """The RMS level is dominated by the loud samples."""
+    window = VuWindow()
+    for value in (-10.0, -20.0, -30.0, -40.0):
+        window.add(value)
+
+    summary = window.summary()
+
+    assert summary.minimum == -40
+    assert summary.maximum == -10
+    assert summary.mean == -25
+    # 10 * log10((0.1 + 0.01 + 0.001 + 0.0001) / 4)
+    assert summary.rms == pytest.approx(-15.56, abs=0.01)
+    assert summary.samples == 4
+    assert summary.as_attributes() == {
+        "min": -40.0,
+        "max": -10.0,
+        "mean": -25.0,
+        "rms": -15.6,
+        "samples": 4,
+    }
+
+
+def test_reset() -> None:
+    """A reset starts an empty window."""
+    window = VuWindow()
+    window.add(-6.0)
+    window.reset()
+    window.add(-18.0)
+
+    assert window.summary() == VuSummary(-18.0, -18.0, -18.0, pytest.approx(-18.0), 1)